@@ -1,46 +1,301 @@
+import asyncio
 import os
-import pickle
-from fastapi import FastAPI, HTTPException, Query
-from pydantic import BaseModel
-import requests
-import pandas as pd
+import secrets
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+import httpx
 from dotenv import load_dotenv
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
-load_dotenv()
+from predictor import OutfitMemo, load_pipelines_predictor
+from model_bundle import MANIFEST, load_bundle, read_manifest
+from model_registry import ModelRegistry, ModelSet
+from outfit_table import OutfitTable
+from tips import TipsEngine
+from metrics import Registry, RequestTimer
+from forecast_agg import aggregate_forecast_days, aggregate_forecast_days_pandas
+from weather_cache import SingleFlight, SQLiteCache, TTLCache, normalize_city
 
-app = FastAPI(title="WeatherWear")
+load_dotenv()
 
 # OpenWeather keys / URLs
 OPENWEATHER_KEY = os.getenv("OPENWEATHER_KEY")
 if not OPENWEATHER_KEY:
     raise RuntimeError("OPENWEATHER_KEY not set in .env")
 
-CURRENT_WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
-FORECAST_WEATHER_URL = "http://api.openweathermap.org/data/2.5/forecast"
+# base URL is configurable so the app can run against a local fake (benchmarks)
+OPENWEATHER_BASE_URL = os.getenv(
+    "OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5"
+).rstrip("/")
+CURRENT_WEATHER_URL = f"{OPENWEATHER_BASE_URL}/weather"
+FORECAST_WEATHER_URL = f"{OPENWEATHER_BASE_URL}/forecast"
+
+# Upstream weather cache (current weather refreshes ~10 min, forecast every few hours)
+WEATHER_CACHE_MAXSIZE = int(os.getenv("WEATHER_CACHE_MAXSIZE", "1024"))
+CURRENT_CACHE_TTL = float(os.getenv("CURRENT_CACHE_TTL", "600"))
+FORECAST_CACHE_TTL = float(os.getenv("FORECAST_CACHE_TTL", "3600"))
+
+# WEATHER_CACHE_BACKEND=sqlite keeps the caches in a SQLite file shared by all
+# uvicorn workers and kept across restarts; "memory" (default) is per process
+WEATHER_CACHE_BACKEND = os.getenv("WEATHER_CACHE_BACKEND", "memory")
+WEATHER_CACHE_PATH = os.getenv(
+    "WEATHER_CACHE_PATH",
+    os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "data", "cache", "weather.sqlite"
+    ),
+)
+
+
+def make_weather_cache(namespace, ttl):
+    if WEATHER_CACHE_BACKEND == "sqlite":
+        # a fetch lease outlives the slowest upstream call before peers give up
+        lease = float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3")) + float(
+            os.getenv("UPSTREAM_READ_TIMEOUT", "10")
+        )
+        return SQLiteCache(
+            WEATHER_CACHE_PATH,
+            namespace,
+            maxsize=WEATHER_CACHE_MAXSIZE,
+            ttl=ttl,
+            lease=lease,
+        )
+    if WEATHER_CACHE_BACKEND != "memory":
+        raise RuntimeError(f"unknown WEATHER_CACHE_BACKEND {WEATHER_CACHE_BACKEND!r}")
+    return TTLCache(maxsize=WEATHER_CACHE_MAXSIZE, ttl=ttl)
+
+
+CURRENT_CACHE = make_weather_cache("current", CURRENT_CACHE_TTL)
+FORECAST_CACHE = make_weather_cache("forecast", FORECAST_CACHE_TTL)
+
+# POST /outfit/batch limits
+BATCH_MAX_CITIES = int(os.getenv("BATCH_MAX_CITIES", "100"))
+BATCH_UPSTREAM_CONCURRENCY = int(os.getenv("BATCH_UPSTREAM_CONCURRENCY", "8"))
+
+# Forecast daily aggregation backend: "numpy" (default) or "pandas"
+AGGREGATE_FORECAST = (
+    aggregate_forecast_days_pandas
+    if os.getenv("FORECAST_AGGREGATION", "numpy") == "pandas"
+    else aggregate_forecast_days
+)
+
+# At most one upstream request in flight per (endpoint, city, units)
+UPSTREAM_FLIGHTS = SingleFlight()
+
+# Pooled keep-alive HTTP client for OpenWeather (shared by all requests)
+UPSTREAM_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "20")),
+    keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+)
+UPSTREAM_TIMEOUT = httpx.Timeout(
+    connect=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", "3")),
+    read=float(os.getenv("UPSTREAM_READ_TIMEOUT", "10")),
+    write=float(os.getenv("UPSTREAM_WRITE_TIMEOUT", "5")),
+    pool=float(os.getenv("UPSTREAM_POOL_TIMEOUT", "5")),
+)
+HTTP_CLIENT = None
+
+# Prometheus metrics at GET /metrics (METRICS_ENABLED=0 removes the endpoint and
+# turns every observation into an early return)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+METRICS = Registry(enabled=METRICS_ENABLED)
+REQUEST_SECONDS = METRICS.histogram(
+    "weatherwear_request_seconds",
+    "Total HTTP request time",
+    ("route", "method", "status"),
+)
+UPSTREAM_SECONDS = METRICS.histogram(
+    "weatherwear_upstream_request_seconds",
+    "OpenWeather request time (status: HTTP status, timeout or error)",
+    ("endpoint", "status"),
+)
+UPSTREAM_ERRORS = METRICS.counter(
+    "weatherwear_upstream_errors_total",
+    "Failed OpenWeather requests (reason: HTTP status, timeout or error)",
+    ("endpoint", "reason"),
+)
+AGGREGATION_SECONDS = METRICS.histogram(
+    "weatherwear_forecast_aggregation_seconds",
+    "Aggregating 3-hour forecast slots into days",
+)
+ENCODE_SECONDS = METRICS.histogram(
+    "weatherwear_feature_encode_seconds",
+    "Encoding model input rows into the feature matrix",
+)
+PREDICT_SECONDS = METRICS.histogram(
+    "weatherwear_model_predict_seconds",
+    "Model predict per label (all: tree tables score every label at once)",
+    ("label",),
+)
+TIPS_SECONDS = METRICS.histogram(
+    "weatherwear_tips_seconds", "Generating outfit tips for a request"
+)
+
+
+def record_model_timing(stage, label, seconds):
+    if stage == "encode":
+        ENCODE_SECONDS.observe(seconds)
+    else:
+        PREDICT_SECONDS.observe(seconds, label)
+
+
+def get_http_client():
+    global HTTP_CLIENT
+    if HTTP_CLIENT is None or HTTP_CLIENT.is_closed:
+        HTTP_CLIENT = httpx.AsyncClient(
+            limits=UPSTREAM_LIMITS, timeout=UPSTREAM_TIMEOUT
+        )
+    return HTTP_CLIENT
+
+
+@asynccontextmanager
+async def lifespan(app):
+    get_http_client()
+    watcher = None
+    if MODEL_WATCH_INTERVAL > 0:
+        watcher = asyncio.create_task(watch_model_bundle(MODEL_WATCH_INTERVAL))
+    yield
+    if watcher is not None:
+        watcher.cancel()
+    if HTTP_CLIENT is not None:
+        await HTTP_CLIENT.aclose()
+
+
+app = FastAPI(title="WeatherWear", lifespan=lifespan)
+if METRICS_ENABLED:
+    app.add_middleware(RequestTimer, histogram=REQUEST_SECONDS)
+
+# Models & artifacts (paths resolve against this file, not the working directory)
+MODEL_DIR = os.getenv(
+    "MODEL_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+)
+# Versioned bundle written by train.py / model_bundle.py; without one the legacy
+# per-label pickles in MODEL_DIR are loaded instead
+MODEL_BUNDLE_PATH = os.getenv("MODEL_BUNDLE_PATH", os.path.join(MODEL_DIR, "bundle"))
+# Scoring backend: "numpy" walks the bundle's exported tree tables, "xgboost"
+# scores with the boosters, "lookup" reads the precomputed outfit table
+# (outfit_table.py builds it) and falls back to the numpy path off-grid
+MODEL_BACKEND = os.getenv("MODEL_BACKEND", "numpy")
+OUTFIT_TABLE_PATH = os.getenv(
+    "OUTFIT_TABLE_PATH", os.path.join(MODEL_DIR, "outfit_table")
+)
+# MODEL_LAZY_LOAD=1 defers loading to the first request that needs a prediction
+MODEL_LAZY_LOAD = os.getenv("MODEL_LAZY_LOAD", "0") == "1"
+
+# Hot reload: POST /admin/models/reload (needs ADMIN_TOKEN) or, with
+# MODEL_WATCH_INTERVAL > 0, polling the bundle manifest for a new version
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", "0"))
+
+
+def load_predictor(bundle_path=None):
+    """
+    MultiHeadPredictor for MODEL_BACKEND from `bundle_path`, else from
+    MODEL_BUNDLE_PATH or, if that has no bundle, the legacy pickles.
+    """
+    if bundle_path is not None or os.path.exists(
+        os.path.join(MODEL_BUNDLE_PATH, MANIFEST)
+    ):
+        return load_bundle(
+            bundle_path or MODEL_BUNDLE_PATH,
+            backend="xgboost" if MODEL_BACKEND == "xgboost" else "numpy",
+        )
+    predictor = load_pipelines_predictor(MODEL_DIR)
+    if MODEL_BACKEND in ("numpy", "lookup"):
+        predictor.use_ensemble(predictor.export_ensemble())
+    return predictor
+
+
+def load_model_set(bundle_path=None):
+    """Predictor plus its outfit table (lookup backend) and memo."""
+    predictor = load_predictor(bundle_path)
+    source = predictor
+    if MODEL_BACKEND == "lookup":
+        table = OutfitTable.load(OUTFIT_TABLE_PATH, fallback=predictor)
+        stale = table.mismatch(predictor)
+        if stale:
+            # e.g. retrained or hot-reloaded models: serve them live until the
+            # table is rebuilt (python outfit_table.py) rather than stale outfits
+            print(f"Outfit table not used ({stale}); serving live inference")
+        else:
+            source = table
+            print(
+                f"Outfit table loaded (max disagreement vs live inference "
+                f"{table.meta['max_disagreement']:.2%})"
+            )
+
+    # Memo of outfits keyed on quantized inputs (OUTFIT_MEMO=0 disables it); each
+    # model set gets a fresh one, so a reload never serves the old models' outfits
+    memo = None
+    if os.getenv("OUTFIT_MEMO", "1") != "0":
+        memo = OutfitMemo(
+            source.predict_outfits,
+            maxsize=int(os.getenv("OUTFIT_MEMO_SIZE", "4096")),
+            steps={
+                "temperature": float(os.getenv("OUTFIT_MEMO_TEMP_STEP", "0.5")),
+                "humidity": float(os.getenv("OUTFIT_MEMO_HUMIDITY_STEP", "1")),
+                "wind_speed": float(os.getenv("OUTFIT_MEMO_WIND_STEP", "0.5")),
+            },
+        )
+    TIPS_ENGINE.compile(
+        {lbl.replace("_label", ""): c for lbl, c in predictor.classes.items()}
+    )
+    if METRICS_ENABLED:
+        predictor.on_timing = record_model_timing
+    models = ModelSet(predictor, source, memo)
+    print(f"Models loaded (version {models.version}).")
+    return models
+
+
+# Outfit tips: rules compiled per label, results memoized (tips.py)
+TIPS_ENGINE = TipsEngine(maxsize=int(os.getenv("TIPS_MEMO_SIZE", "4096")))
+
+MODEL_REGISTRY = ModelRegistry(load_model_set)
+if not MODEL_LAZY_LOAD:
+    MODEL_REGISTRY.get()
 
-# Models & artifacts
-MODEL_PATHS = {
-    "top_label": "models/top_label_model.pkl",
-    "bottom_label": "models/bottom_label_model.pkl",
-    "footwear_label": "models/footwear_label_model.pkl",
-    "accessory_label": "models/accessory_label_model.pkl",
-}
 
-MODELS = {}
-for key, path in MODEL_PATHS.items():
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"{path} not found")
-    with open(path, "rb") as f:
-        MODELS[key] = pickle.load(f)
+def get_models():
+    """The active ModelSet; take it once per request and use it throughout."""
+    return MODEL_REGISTRY.get()
 
-with open("models/global_label_encoders.pkl", "rb") as f:
-    LABEL_ENCODERS = pickle.load(f)
 
-with open("models/preprocessor.pkl", "rb") as f:
-    PREPROCESSOR = pickle.load(f)
+async def reload_models(bundle_path=None):
+    """Load, validate and swap in a model set in a worker thread."""
+    return await asyncio.to_thread(MODEL_REGISTRY.reload, bundle_path)
 
-print("Models, encoders, preprocessor loaded successfully.")
+
+async def watch_model_bundle(interval):
+    """
+    Reload whenever the version in MODEL_BUNDLE_PATH's manifest changes (a
+    version that fails to load is not retried until the manifest changes again).
+    """
+
+    def manifest_version():
+        try:
+            return read_manifest(MODEL_BUNDLE_PATH)["version"]
+        except (OSError, ValueError, KeyError):
+            return None  # missing or mid-replace; try again next tick
+
+    # lazy mode: nothing is loaded yet, so start from the bundle on disk
+    seen = get_models().version if MODEL_REGISTRY.loaded else manifest_version()
+    while True:
+        await asyncio.sleep(interval)
+        version = manifest_version()
+        if version is None or version == seen:
+            continue
+        seen = version
+        if not MODEL_REGISTRY.loaded:
+            continue  # the first request will load this version anyway
+        try:
+            previous, current, _ = await reload_models()
+            print(f"Models reloaded {previous} -> {current}")
+        except Exception as e:
+            print(f"Model reload of {version} failed: {e}")
 
 
 # Utilities
@@ -54,9 +309,9 @@ def f_to_c(f):
 
 def get_season(timestamp=None):
     if not timestamp:
-        month = pd.Timestamp.now().month
+        month = datetime.now().month
     else:
-        month = pd.to_datetime(timestamp, unit="s").month
+        month = datetime.fromtimestamp(timestamp, timezone.utc).month
     if month in [12, 1, 2]:
         return "Winter"
     if month in [3, 4, 5]:
@@ -67,19 +322,65 @@ def get_season(timestamp=None):
 
 
 # Weather fetchers
-def fetch_current_weather_for_model(city: str):
+async def fetch_openweather(url, cache, city, error_message):
+    """
+    GET an OpenWeather endpoint (metric units) through `cache`, keyed on the
+    normalized city name. Only successful payloads are cached. Concurrent misses
+    for the same city share a single upstream request.
+    """
+    key = normalize_city(city)
+    data = await cache.aget(key)
+    if data is not None:
+        return data
+    return await UPSTREAM_FLIGHTS.do(
+        (url, key, "metric"),
+        lambda: request_openweather(url, cache, key, city, error_message),
+    )
+
+
+async def request_openweather(url, cache, key, city, error_message):
+    if not await cache.aclaim(key):
+        # another worker process is fetching this city (shared cache); use its
+        # result, or fetch it here if it fails or the lease runs out
+        data = await cache.wait_for(key)
+        if data is not None:
+            return data
+    params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
+    endpoint = url.rsplit("/", 1)[-1]
+    started = time.perf_counter()
+    try:
+        r = await get_http_client().get(url, params=params)
+    except httpx.TimeoutException:
+        UPSTREAM_SECONDS.since(started, endpoint, "timeout")
+        UPSTREAM_ERRORS.inc(endpoint, "timeout")
+        raise HTTPException(status_code=504, detail="Weather API timed out")
+    except httpx.HTTPError as e:
+        UPSTREAM_SECONDS.since(started, endpoint, "error")
+        UPSTREAM_ERRORS.inc(endpoint, "error")
+        raise HTTPException(status_code=502, detail=f"Weather API unreachable: {e}")
+    else:
+        UPSTREAM_SECONDS.since(started, endpoint, str(r.status_code))
+        if r.status_code != 200:
+            UPSTREAM_ERRORS.inc(endpoint, str(r.status_code))
+            raise HTTPException(
+                status_code=r.status_code,
+                detail=r.json().get("message", error_message),
+            )
+        data = r.json()
+        await cache.aset(key, data)
+        return data
+    finally:
+        await cache.arelease(key)
+
+
+async def fetch_current_weather_for_model(city: str):
     """
     Fetch current weather in METRIC units (Celsius). Return dict used as model input.
     This function ALWAYS uses metric so model inputs are stable.
     """
-    params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
-    r = requests.get(CURRENT_WEATHER_URL, params=params, timeout=10)
-    if r.status_code != 200:
-        raise HTTPException(
-            status_code=r.status_code,
-            detail=r.json().get("message", "Weather API error"),
-        )
-    data = r.json()
+    data = await fetch_openweather(
+        CURRENT_WEATHER_URL, CURRENT_CACHE, city, "Weather API error"
+    )
     w = {
         "temperature_c": float(data["main"]["temp"]),
         "feels_like_c": float(data["main"].get("feels_like", data["main"]["temp"])),
@@ -95,80 +396,26 @@ def fetch_current_weather_for_model(city: str):
     return w
 
 
-def fetch_forecast_days(city: str, days: int = 3):
+async def fetch_forecast_days(city: str, days: int = 3):
     """
     Fetch 5-day/3-hour forecast from OpenWeather (metric). Aggregate to calendar days,
     return list of daily aggregates (date, temp_c, humidity, wind_speed, condition, rain_flag).
     Excludes today and returns next `days` calendar days.
     """
-    params = {"q": city, "appid": OPENWEATHER_KEY, "units": "metric"}
-    r = requests.get(FORECAST_WEATHER_URL, params=params, timeout=10)
-    if r.status_code != 200:
-        raise HTTPException(
-            status_code=r.status_code,
-            detail=r.json().get("message", "Forecast API error"),
-        )
-    data = r.json()
-    df = pd.DataFrame(
-        [
-            {
-                "dt": item["dt"],
-                "dt_txt": item["dt_txt"],
-                "temp": item["main"]["temp"],
-                "feels_like": item["main"].get("feels_like", item["main"]["temp"]),
-                "humidity": item["main"]["humidity"],
-                "wind_speed": item["wind"]["speed"],
-                "condition": item["weather"][0]["main"],
-                "rain": (
-                    1
-                    if any(k in item and item[k] for k in ("rain",))
-                    or item["weather"][0]["main"] in ["Rain", "Thunderstorm"]
-                    else 0
-                ),
-            }
-            for item in data.get("list", [])
-        ]
+    data = await fetch_openweather(
+        FORECAST_WEATHER_URL, FORECAST_CACHE, city, "Forecast API error"
     )
-    if df.empty:
+    items = data.get("list", [])
+    if not items:
         raise HTTPException(status_code=500, detail="Empty forecast data")
-
-    df["date"] = pd.to_datetime(df["dt_txt"]).dt.date
-    today = pd.Timestamp.now().date()
-
-    # exclude today; keep next calendar days
-    df_future = df[df["date"] > today]
-
-    if df_future.empty:
-        # sometimes forecast has same-day only — fallback: include today+next two 3-hour buckets
-        df_future = df
-
-    days_agg = []
-    # get up to `days` unique dates (next days)
-    unique_dates = sorted(df_future["date"].unique())[:days]
-    for d in unique_dates:
-        sub = df_future[df_future["date"] == d]
-        days_agg.append(
-            {
-                "date": str(d),
-                "temp_c": float(sub["temp"].mean()),
-                "feels_like_c": float(sub["feels_like"].mean()),
-                "humidity": float(sub["humidity"].mean()),
-                "wind_speed": float(sub["wind_speed"].mean()),
-                "condition": (
-                    sub["condition"].mode()[0]
-                    if not sub["condition"].mode().empty
-                    else sub["condition"].iloc[0]
-                ),
-                "rain": int(sub["rain"].max() > 0),
-                "timestamp": int(sub["dt"].iloc[0]),
-                "season": get_season(int(sub["dt"].iloc[0])),
-            }
-        )
+    started = time.perf_counter()
+    days_agg = AGGREGATE_FORECAST(items, days=days)
+    AGGREGATION_SECONDS.since(started)
     return days_agg
 
 
 # Prediction
-def construct_model_df_row(
+def model_input_row(
     temp_c,
     humidity,
     wind_speed,
@@ -179,225 +426,187 @@ def construct_model_df_row(
     season="Spring",
     condition="Clear",
 ):
-    return pd.DataFrame(
-        [
-            {
-                "temperature": temp_c,
-                "humidity": humidity,
-                "wind_speed": wind_speed,
-                "rain": rain,
-                "gender": gender,
-                "hour": hour,
-                "day_of_week": day_of_week,
-                "season": season,
-                "weather_condition": condition,
-            }
-        ]
-    )
-
-
-def predict_from_models(model_input_df):
-    outfit = {}
-    for lbl, model in MODELS.items():
-        pred = model.predict(model_input_df)[0]
-        pred_label = LABEL_ENCODERS[lbl].inverse_transform([pred])[0]
-        outfit[lbl.replace("_label", "")] = pred_label
-    return outfit
-
-
-# Tips Generator
-def generate_tips_from_outfit(outfit, gender, weather):
-    tips = []
-
-    # WEATHER & OUTFIT EXTRACTION
-    temp = weather.get("temperature_c", weather.get("temp_c"))
-    cond = weather.get("weather_condition", "").lower()
-
-    is_rain = weather.get("rain", False) or "rain" in cond
-    is_snow = weather.get("snow", False) or "snow" in cond
-
-    top = outfit.get("top", "").lower()
-    bottom = outfit.get("bottom", "").lower()
-    footwear = outfit.get("footwear", "").lower()
-    accessory = outfit.get("accessory", "").lower()
-
-    # TOP TIPS
-    top_tips = []
-
-    if any(
-        k in top
-        for k in [
-            "puffer_jacket",
-            "quilted_jacket",
-            "insulated_parka",
-            "coat",
-            "thermal",
-            "hoodie",
-            "sweater",
-        ]
-    ):
-        top_tips.append(f"{top} provides warmth and is suitable for cold weather.")
+    return {
+        "temperature": temp_c,
+        "humidity": humidity,
+        "wind_speed": wind_speed,
+        "rain": rain,
+        "gender": gender,
+        "hour": hour,
+        "day_of_week": day_of_week,
+        "season": season,
+        "weather_condition": condition,
+    }
 
-    elif any(k in top for k in ["tshirt", "shirt"]):
-        top_tips.append(
-            f"{top.capitalize()} is suitable for mild or warm temperatures."
-        )
 
-    else:
-        top_tips.append(
-            f"{top.capitalize()} can be worn depending on personal comfort."
-        )
+def predict_outfits(model_inputs, models=None):
+    """
+    Encode a list of `model_input_row` dicts once (no pandas), run each label
+    model over the batch and return one outfit dict per row. Rows already in
+    the outfit memo skip inference. `models` defaults to the active ModelSet.
+    """
+    return (models or get_models()).predict_outfits(model_inputs)
 
-    tips.extend(top_tips)
 
-    # BOTTOM TIPS
-    bottom_tips = []
+def predict_from_models(model_input, models=None):
+    return predict_outfits([model_input], models)[0]
 
-    if "skirt" in bottom and gender != "female":
-        bottom_tips.append(f"A {bottom} may feel cold for {gender}.")
 
-    elif "shorts" in bottom and (temp is not None and temp < 20):
-        bottom_tips.append("Shorts may feel chilly at this temperature.")
+# Tips Generator
+def generate_tips_from_outfit(outfit, gender, weather):
+    return TIPS_ENGINE.tips(outfit, gender, weather)
 
-    else:
-        bottom_tips.append(f"{bottom.capitalize()} is suitable for current weather.")
 
-    tips.extend(bottom_tips)
+# Endpoints
+def current_model_input(w, gender):
+    """Model input row (Celsius) for current weather `w` and `gender`."""
+    return model_input_row(
+        temp_c=w["temperature_c"],
+        humidity=w["humidity"],
+        wind_speed=w["wind_speed"],
+        rain=w["rain"],
+        gender=gender,
+        hour=12,
+        day_of_week=(
+            datetime.utcfromtimestamp(w["timestamp"]).strftime("%a")
+            if w.get("timestamp")
+            else "Mon"
+        ),
+        season=w["season"],
+        condition=w["weather_condition"],
+    )
 
-    # FOOTWEAR TIPS
-    footwear_tips = []
 
-    if is_snow:
-        if not any(k in footwear for k in ["boot", "snow", "insulated", "waterproof"]):
-            footwear_tips.append(
-                "Snowy conditions — insulated waterproof boots are recommended."
-            )
-        else:
-            footwear_tips.append(f"{footwear.capitalize()} are appropriate for snow.")
-
-    elif is_rain:
-        if not any(
-            k in footwear for k in ["gumboot", "rainboot", "waterproof", "boot"]
-        ):
-            footwear_tips.append(
-                "Rainy weather — waterproof footwear will keep your feet dry."
-            )
-        else:
-            footwear_tips.append(f"{footwear.capitalize()} are suitable for rain.")
+def outfit_response(city, gender, unit, w, outfit, model_version, tips=None):
+    if tips is None:
+        tips = generate_tips_from_outfit(outfit, gender, w)
 
+    # prepare response temps in requested unit
+    if unit.upper() == "F":
+        temp = round(c_to_f(w["temperature_c"]), 1)
+        feels = round(c_to_f(w["feels_like_c"]), 1)
     else:
-        footwear_tips.append(f"{footwear.capitalize()} are suitable for daily use.")
-
-    tips.extend(footwear_tips)
-
-    # ACCESSORIES TIPS
-    accessory_tips = []
-
-    # Weather overrides (always show even if accessory = none)
-    if is_rain:
-        accessory_tips.append("Rainy weather — carry an umbrella or wear a raincoat.")
-
-    elif is_snow:
-        accessory_tips.append(
-            "Snowy weather — stay warm: wear sherpa topi, gloves, and a scarf."
-        )
-
-    # Normal accessory rules (ONLY if accessory exists and is not "none")
-    elif accessory and accessory != "none":
-        if temp is not None:
-
-            # Cold
-            if temp <= 5:
-                if not any(
-                    k in accessory for k in ["scarf", "gloves", "hat", "beanie"]
-                ):
-                    accessory_tips.append(
-                        "Add scarf, gloves, or a warm hat for very cold weather."
-                    )
-                else:
-                    accessory_tips.append(f"Wear {accessory} to keep warm.")
-
-            # Hot
-            elif temp >= 26:
-                accessory_tips.append(
-                    f"Wear {accessory} to stay cool and protected from sun."
-                )
-
-            # Mild
-            else:
-                accessory_tips.append(
-                    f"{accessory.capitalize()} can complement your outfit."
-                )
-
-    if accessory_tips:
-        tips.extend(accessory_tips)
-
-    # LAYERING ADVICE
-    if temp is not None and temp < 7:
-        tips.append(
-            "It's too cold — layering is recommended: base layer + insulating layer + outer shell."
-        )
-
-    return tips
+        temp = round(w["temperature_c"], 1)
+        feels = round(w["feels_like_c"], 1)
+
+    return {
+        "city": city,
+        "gender": gender,
+        "temperature": temp,
+        "feels_like": feels,
+        "humidity": w["humidity"],
+        "wind_speed": w["wind_speed"],
+        "weather_condition": w["weather_condition"],
+        "season": w["season"],
+        "unit": unit.upper(),
+        "outfit": {**outfit, "tips": tips},
+        "model_version": model_version,
+    }
 
 
 # Endpoints
 @app.get("/outfit/{city}")
-def get_outfit(
+async def get_outfit(
     city: str,
     gender: str = Query("male", enum=["male", "female", "baby"]),
     unit: str = Query("C", enum=["C", "F"]),
 ):
     try:
-        w = fetch_current_weather_for_model(city)
-        # build model input (Celsius)
-        model_df = construct_model_df_row(
-            temp_c=w["temperature_c"],
-            humidity=w["humidity"],
-            wind_speed=w["wind_speed"],
-            rain=w["rain"],
-            gender=gender,
-            hour=12,
-            day_of_week=(
-                datetime.utcfromtimestamp(w["timestamp"]).strftime("%a")
-                if w.get("timestamp")
-                else "Mon"
-            ),
-            season=w["season"],
-            condition=w["weather_condition"],
-        )
-        outfit = predict_from_models(model_df)
+        w = await fetch_current_weather_for_model(city)
+        models = get_models()
+        outfit = predict_from_models(current_model_input(w, gender), models)
+        started = time.perf_counter()
         tips = generate_tips_from_outfit(outfit, gender, w)
-
-        # prepare response temps in requested unit
-        if unit.upper() == "F":
-            temp = round(c_to_f(w["temperature_c"]), 1)
-            feels = round(c_to_f(w["feels_like_c"]), 1)
-        else:
-            temp = round(w["temperature_c"], 1)
-            feels = round(w["feels_like_c"], 1)
-
-        response = {
-            "city": city,
-            "gender": gender,
-            "temperature": temp,
-            "feels_like": feels,
-            "humidity": w["humidity"],
-            "wind_speed": w["wind_speed"],
-            "weather_condition": w["weather_condition"],
-            "season": w["season"],
-            "unit": unit.upper(),
-            "outfit": {**outfit, "tips": tips},
-        }
-        return response
+        TIPS_SECONDS.since(started)
+        return outfit_response(city, gender, unit, w, outfit, models.version, tips)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class OutfitBatchRequest(BaseModel):
+    cities: List[str] = Field(..., min_length=1, max_length=BATCH_MAX_CITIES)
+    genders: List[Literal["male", "female", "baby"]] = Field(
+        ["male"], min_length=1, max_length=3
+    )
+    unit: Literal["C", "F"] = "C"
+
+
+@app.post("/outfit/batch")
+async def get_outfit_batch(req: OutfitBatchRequest):
+    """
+    Outfits for every (city, gender) pair. Each distinct city's weather is
+    fetched once (at most BATCH_UPSTREAM_CONCURRENCY at a time) and all rows go
+    through one inference pass. A failed city only fails its own items.
+    """
+    cities = {}
+    for city in req.cities:
+        cities.setdefault(normalize_city(city), city)
+    limit = asyncio.Semaphore(BATCH_UPSTREAM_CONCURRENCY)
+
+    async def fetch(city):
+        async with limit:
+            return await fetch_current_weather_for_model(city)
+
+    fetched = await asyncio.gather(
+        *(fetch(city) for city in cities.values()), return_exceptions=True
+    )
+    weather = dict(zip(cities, fetched))
+
+    pairs = [(city, gender) for city in req.cities for gender in req.genders]
+    ok = [
+        (city, gender)
+        for city, gender in pairs
+        if not isinstance(weather[normalize_city(city)], BaseException)
+    ]
+    models = get_models()
+    outfits = {}
+    # every city failed: nothing to predict
+    if ok:
+        try:
+            predicted = predict_outfits(
+                [
+                    current_model_input(weather[normalize_city(city)], gender)
+                    for city, gender in ok
+                ],
+                models,
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        started = time.perf_counter()
+        tips = TIPS_ENGINE.tips_batch(
+            [
+                (outfit, gender, weather[normalize_city(city)])
+                for (city, gender), outfit in zip(ok, predicted)
+            ]
+        )
+        TIPS_SECONDS.since(started)
+        outfits = dict(zip(ok, zip(predicted, tips)))
+
+    items = []
+    for city, gender in pairs:
+        w = weather[normalize_city(city)]
+        if isinstance(w, HTTPException):
+            error = {"status_code": w.status_code, "detail": w.detail}
+        elif isinstance(w, BaseException):
+            error = {"status_code": 500, "detail": str(w)}
+        else:
+            outfit, tips = outfits[(city, gender)]
+            items.append(
+                outfit_response(city, gender, req.unit, w, outfit, models.version, tips)
+            )
+            continue
+        items.append({"city": city, "gender": gender, "error": error})
+    return {
+        "items": items,
+        "errors": sum("error" in item for item in items),
+        "model_version": models.version,
+    }
+
+
 @app.get("/forecast/{city}")
-def get_forecast(
+async def get_forecast(
     city: str,
     gender: str = Query("male", enum=["male", "female", "baby"]),
     unit: str = Query("C", enum=["C", "F"]),
@@ -408,11 +617,10 @@ def get_forecast(
     Model inputs are computed in Celsius (forecast uses metric), response temps converted to requested unit.
     """
     try:
-        days_agg = fetch_forecast_days(city, days=days)
-        forecasts = []
-        for day in days_agg:
-            # model input uses Celsius (temp_c)
-            model_df = construct_model_df_row(
+        days_agg = await fetch_forecast_days(city, days=days)
+        # model input uses Celsius (temp_c); all days are predicted in one batch
+        model_inputs = [
+            model_input_row(
                 temp_c=day["temp_c"],
                 humidity=day["humidity"],
                 wind_speed=day["wind_speed"],
@@ -423,10 +631,21 @@ def get_forecast(
                 season=day["season"],
                 condition=day["condition"],
             )
-            outfit = predict_from_models(model_df)
-            tips = generate_tips_from_outfit(
-                outfit, gender, {"temperature_c": day["temp_c"], "rain": day["rain"]}
-            )
+            for day in days_agg
+        ]
+        models = get_models()
+        outfits = predict_outfits(model_inputs, models)
+        started = time.perf_counter()
+        day_tips = TIPS_ENGINE.tips_batch(
+            [
+                (outfit, gender, {"temperature_c": day["temp_c"], "rain": day["rain"]})
+                for day, outfit in zip(days_agg, outfits)
+            ]
+        )
+        TIPS_SECONDS.since(started)
+
+        forecasts = []
+        for day, outfit, tips in zip(days_agg, outfits, day_tips):
 
             # convert display temp
             if unit.upper() == "F":
@@ -450,8 +669,107 @@ def get_forecast(
                     "outfit": {**outfit, "tips": tips},
                 }
             )
-        return {"city": city, "forecasts": forecasts}
+        return {
+            "city": city,
+            "forecasts": forecasts,
+            "model_version": models.version,
+        }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    memo = get_models().memo if MODEL_REGISTRY.loaded else None
+    return {
+        "current": CURRENT_CACHE.stats(),
+        "forecast": FORECAST_CACHE.stats(),
+        "singleflight": UPSTREAM_FLIGHTS.stats(),
+        "outfit_memo": memo.stats() if memo is not None else None,
+        "tips": TIPS_ENGINE.stats(),
+        "models": MODEL_REGISTRY.stats(),
+    }
+
+
+@METRICS.collector
+def cache_metrics():
+    """Counters kept by the caches and the model registry, read at scrape time."""
+    caches = {"current": CURRENT_CACHE, "forecast": FORECAST_CACHE}
+    memo = get_models().memo if MODEL_REGISTRY.loaded else None
+    yield (
+        "weatherwear_weather_cache_hits_total",
+        "counter",
+        "Weather cache hits",
+        [({"cache": name}, cache.hits) for name, cache in caches.items()],
+    )
+    yield (
+        "weatherwear_weather_cache_misses_total",
+        "counter",
+        "Weather cache misses",
+        [({"cache": name}, cache.misses) for name, cache in caches.items()],
+    )
+    yield (
+        "weatherwear_upstream_collapsed_total",
+        "counter",
+        "Upstream requests coalesced into one already in flight",
+        [({}, UPSTREAM_FLIGHTS.collapsed)],
+    )
+    if memo is not None:
+        yield (
+            "weatherwear_outfit_memo_hits_total",
+            "counter",
+            "Outfits served from the memo of the active model set",
+            [({}, memo.stats()["hits"])],
+        )
+    if MODEL_REGISTRY.loaded:
+        yield (
+            "weatherwear_model_info",
+            "gauge",
+            "Active model version",
+            [({"version": get_models().version}, 1)],
+        )
+
+
+if METRICS_ENABLED:
+
+    @app.get("/metrics", include_in_schema=False)
+    def metrics():
+        return PlainTextResponse(METRICS.render(), media_type=Registry.CONTENT_TYPE)
+
+
+def require_admin(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not secrets.compare_digest(token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+class ModelReloadRequest(BaseModel):
+    bundle_path: Optional[str] = None
+
+
+@app.post("/admin/models/reload")
+async def admin_reload_models(
+    req: Optional[ModelReloadRequest] = None,
+    x_admin_token: Optional[str] = Header(None),
+):
+    """
+    Load a model bundle (default MODEL_BUNDLE_PATH) in the background, check it
+    on the canary rows and swap it in. Requests already running finish on the
+    previous models; on failure the previous models stay active. Only this
+    worker process reloads; MODEL_WATCH_INTERVAL is the fleet-wide trigger.
+    """
+    require_admin(x_admin_token)
+    try:
+        previous, current, changed = await reload_models(
+            req.bundle_path if req else None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=f"Model reload failed: {e}")
+    return {
+        "previous_version": previous,
+        "model_version": current,
+        "canary_outfits_changed": changed,
+    }
@@ -0,0 +1,109 @@
+"""
+One-hot pipelines vs XGBoost native categorical splits for the label models.
+
+Both variants are trained on the same noisy rows and train / test splits
+(train.design_matrix). The script reports held-out accuracy, training time
+and bundle size. It also times single-row and batch latency (encode +
+predict) through a loaded bundle on each serving backend, and checks that
+both backends return the same outfits.
+
+    cd backend && python -m benchmarks.categorical_encoding
+    cd backend && python -m benchmarks.categorical_encoding --n-estimators 50
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import train
+from benchmarks.feature_encoding import random_rows, time_per_call
+from model_bundle import load_bundle, write_bundle
+from predictor import LABELS, MultiHeadPredictor
+
+
+def size_mb(*paths):
+    total = 0
+    for path in paths:
+        if os.path.isdir(path):
+            total += sum(
+                os.path.getsize(os.path.join(path, name)) for name in os.listdir(path)
+            )
+        else:
+            total += os.path.getsize(path)
+    return total / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--data", default="data/synthetic_30k.csv")
+    parser.add_argument("--n-estimators", type=int)
+    parser.add_argument("--threads", type=int, default=os.cpu_count())
+    parser.add_argument("--rows", type=int, default=1000, help="batch size")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = random_rows(args.rows)
+    for encoding in ("onehot", "categorical"):
+        design = train.design_matrix(args.data, encoding=encoding)
+        X, encoder = design["X"], design["encoder"]
+
+        started = time.perf_counter()
+        fitted = {
+            lbl: train.train_label(
+                lbl, design, args.threads, n_estimators=args.n_estimators
+            )[0]
+            for lbl in LABELS
+        }
+        seconds = time.perf_counter() - started
+        accuracy = {}
+        for lbl, clf in fitted.items():
+            test = design["splits"][lbl][1]
+            accuracy[lbl] = float(
+                np.mean(clf.predict(X[test]) == design["y"][lbl][test])
+            )
+
+        predictor = MultiHeadPredictor(
+            encoder,
+            {lbl: clf.get_booster() for lbl, clf in fitted.items()},
+            {lbl: le.classes_ for lbl, le in design["label_encoders"].items()},
+        )
+        predictor.use_ensemble(predictor.export_ensemble())
+
+        print(f"\n{encoding}: {encoder.n_features} columns, trained in {seconds:.2f} s")
+        print(
+            "  held-out accuracy  "
+            + "  ".join(f"{lbl} {acc:.4f}" for lbl, acc in accuracy.items())
+        )
+        with tempfile.TemporaryDirectory() as tmp:
+            bundle = os.path.join(tmp, "bundle")
+            write_bundle(predictor, bundle)
+            boosters = size_mb(os.path.join(bundle, "boosters"))
+            tables = size_mb(os.path.join(bundle, "tree_ensemble.npz"))
+            print(
+                f"  bundle size        boosters {boosters:.2f} MB   tree tables {tables:.2f} MB"
+            )
+
+            outfits = None
+            for backend in ("numpy", "xgboost"):
+                loaded = load_bundle(bundle, backend=backend)
+                got = loaded.predict_outfits(rows)
+                if outfits is None:
+                    outfits = got
+                assert got == outfits, f"{backend} backend disagrees"
+                one = time_per_call(
+                    lambda: loaded.predict_outfits(rows[:1]), args.repeat
+                )
+                batch = time_per_call(
+                    lambda: loaded.predict_outfits(rows), max(1, args.repeat // 20)
+                )
+                print(
+                    f"  {backend:<8} latency   1 row {one * 1e6:8.1f} µs   "
+                    f"{args.rows} rows {batch * 1e3:8.2f} ms"
+                )
+
+
+if __name__ == "__main__":
+    main()
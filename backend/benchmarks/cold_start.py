@@ -0,0 +1,74 @@
+"""
+Worker cold start: legacy pickles vs the model bundle (eager and lazy).
+
+Each configuration runs in a fresh interpreter that imports `app` and serves one
+prediction; reports import time, first-prediction latency and peak RSS.
+
+    cd backend && python -m benchmarks.cold_start --repeat 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+CHILD = """
+import json, resource, sys, time, warnings
+warnings.filterwarnings("ignore")
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.predict_outfits([app.model_input_row(8.0, 70, 3.0, 0, "female")])
+done = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - started,
+    "first_prediction_s": done - imported,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_modules": [m for m in ("pandas", "sklearn", "xgboost") if m in sys.modules],
+}))
+"""
+
+CONFIGS = {
+    "legacy pickles": {"MODEL_BUNDLE_PATH": os.devnull},
+    "bundle (eager)": {},
+    "bundle (lazy)": {"MODEL_LAZY_LOAD": "1"},
+}
+
+
+def run(env_overrides):
+    env = dict(os.environ, OPENWEATHER_KEY="benchmark", **env_overrides)
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(
+        f"{'':<16}{'import':>10}{'1st predict':>13}{'import+1st':>12}{'peak RSS':>11}"
+    )
+    for name, env in CONFIGS.items():
+        runs = [run(env) for _ in range(args.repeat)]
+        imp = statistics.median(r["import_s"] for r in runs)
+        first = statistics.median(r["first_prediction_s"] for r in runs)
+        total = statistics.median(r["import_s"] + r["first_prediction_s"] for r in runs)
+        rss = statistics.median(r["rss_mb"] for r in runs)
+        heavy = ", ".join(runs[0]["heavy_modules"]) or "none"
+        print(
+            f"{name:<16}{imp * 1e3:>8.0f}ms{first * 1e3:>11.1f}ms"
+            f"{total * 1e3:>10.0f}ms{rss:>8.0f} MB   loads {heavy}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Local stand-in for the OpenWeather current-weather and 5-day forecast APIs.
+
+Payloads are generated deterministically from the city name, so repeated runs
+serve the same weather. Latency and failures are injected from environment
+variables, read at startup:
+
+    FAKE_OW_LATENCY_MS     mean added latency per request (default 0)
+    FAKE_OW_JITTER_MS      uniform +/- jitter around it (default 0)
+    FAKE_OW_ERROR_RATE     fraction of requests answered 500 (default 0)
+    FAKE_OW_SEED           seed for jitter and error draws (default 0)
+
+    cd backend && FAKE_OW_LATENCY_MS=80 uvicorn benchmarks.fake_openweather:app --port 9001
+
+GET /stats returns request / error counts per endpoint.
+"""
+
+import asyncio
+import os
+import random
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_OW_LATENCY_MS", "0"))
+JITTER_MS = float(os.getenv("FAKE_OW_JITTER_MS", "0"))
+ERROR_RATE = float(os.getenv("FAKE_OW_ERROR_RATE", "0"))
+RNG = random.Random(int(os.getenv("FAKE_OW_SEED", "0")))
+
+CONDITIONS = ["Clear", "Clouds", "Rain", "Drizzle", "Thunderstorm", "Snow", "Mist"]
+
+app = FastAPI(title="fake OpenWeather")
+COUNTS = Counter()
+
+
+def city_weather(city, offset=0):
+    """Deterministic (temperature, humidity, wind, condition) for a city and slot."""
+    r = random.Random(zlib.crc32(f"{city.lower()}:{offset}".encode()))
+    temp = round(r.uniform(-10, 40), 2)
+    condition = "Snow" if temp < 0 and r.random() < 0.5 else r.choice(CONDITIONS)
+    return temp, r.randint(10, 100), round(r.uniform(0, 15), 2), condition
+
+
+def slot(city, dt, offset):
+    temp, humidity, wind, condition = city_weather(city, offset)
+    item = {
+        "dt": int(dt.timestamp()),
+        "main": {
+            "temp": temp,
+            "feels_like": round(temp - wind / 3, 2),
+            "humidity": humidity,
+            "pressure": 1013,
+        },
+        "wind": {"speed": wind},
+        "weather": [{"main": condition}],
+        "visibility": 10000,
+    }
+    if condition in ("Rain", "Thunderstorm"):
+        item["rain"] = {"3h": 1.2}
+    return item
+
+
+async def respond(endpoint, build):
+    COUNTS[endpoint] += 1
+    delay = LATENCY_MS + (RNG.uniform(-JITTER_MS, JITTER_MS) if JITTER_MS else 0)
+    if delay > 0:
+        await asyncio.sleep(delay / 1000)
+    if ERROR_RATE and RNG.random() < ERROR_RATE:
+        COUNTS[f"{endpoint}_errors"] += 1
+        return JSONResponse({"cod": 500, "message": "injected error"}, status_code=500)
+    return build()
+
+
+@app.get("/weather")
+async def weather(q: str, appid: str = "", units: str = "metric"):
+    now = datetime.now(timezone.utc)
+    return await respond("weather", lambda: slot(q, now, 0))
+
+
+@app.get("/forecast")
+async def forecast(q: str, appid: str = "", units: str = "metric"):
+    # 40 three-hour slots from today's midnight (UTC), like the real API
+    start = datetime.now(timezone.utc).replace(
+        hour=0, minute=0, second=0, microsecond=0
+    )
+
+    def build():
+        items = []
+        for i in range(40):
+            dt = start + timedelta(hours=3 * i)
+            item = slot(q, dt, i)
+            item["dt_txt"] = dt.strftime("%Y-%m-%d %H:%M:%S")
+            items.append(item)
+        return {"cod": "200", "cnt": len(items), "list": items}
+
+    return await respond("forecast", build)
+
+
+@app.get("/stats")
+async def stats():
+    return dict(COUNTS)
@@ -0,0 +1,80 @@
+"""
+Serving feature encoder vs the fitted sklearn preprocessor.
+
+Checks that FeatureEncoder reproduces the ColumnTransformer output exactly on
+random inputs (including unseen categories), then times single-row and batch
+encoding both ways.
+
+    cd backend && python -m benchmarks.feature_encoding
+"""
+
+import argparse
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from predictor import FEATURES, FeatureEncoder
+
+CHOICES = {
+    "gender": ["male", "female", "baby", "other"],
+    "day_of_week": ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
+    "season": ["Spring", "Summer", "Autumn", "Winter"],
+    "weather_condition": ["Clear", "Clouds", "Rain", "Snow", "Thunderstorm", "Mist"],
+}
+
+
+def random_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = {
+        "temperature": rng.uniform(-15, 48, n),
+        "humidity": rng.uniform(10, 100, n),
+        "wind_speed": rng.uniform(0, 20, n),
+        "rain": rng.integers(0, 2, n),
+        "hour": rng.integers(0, 24, n),
+        **{f: rng.choice(c, n) for f, c in CHOICES.items()},
+    }
+    return [
+        {f: cols[f][i].item() for f in FEATURES} for i in range(n)
+    ]  # plain Python scalars, as the app builds them
+
+
+def time_per_call(fn, repeat):
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--preprocessor", default="models/preprocessor.pkl")
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    with open(args.preprocessor, "rb") as f:
+        preprocessor = pickle.load(f)
+    encoder = FeatureEncoder.from_preprocessor(preprocessor)
+
+    rows = random_rows(args.rows)
+    encoder.check_against(preprocessor, rows)
+    print(f"✔ FeatureEncoder matches the preprocessor on {len(rows)} random rows")
+
+    for n in (1, 3, 100):
+        batch = rows[:n]
+        slow = time_per_call(
+            lambda: preprocessor.transform(pd.DataFrame(batch, columns=FEATURES)),
+            args.repeat,
+        )
+        fast = time_per_call(lambda: encoder.encode(batch), args.repeat)
+        print(
+            f"{n:>4} rows: DataFrame + transform {slow * 1e6:9.1f} µs   "
+            f"FeatureEncoder {fast * 1e6:8.1f} µs   {slow / fast:6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
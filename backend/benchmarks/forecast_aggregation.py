@@ -0,0 +1,150 @@
+"""
+Per-request cost of forecast daily aggregation.
+
+Compares the original per-date DataFrame filtering (reproduced below as the
+reference) with the grouped pandas and single-pass NumPy versions, checks they
+return the same daily dicts, and prints the mean time per call.
+
+    cd backend && python -m benchmarks.forecast_aggregation
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from forecast_agg import aggregate_forecast_days, aggregate_forecast_days_pandas
+
+
+def reference_aggregate(items, days=3, today=None):
+    # original fetch_forecast_days aggregation, kept verbatim for comparison
+    df = pd.DataFrame(
+        [
+            {
+                "dt": item["dt"],
+                "dt_txt": item["dt_txt"],
+                "temp": item["main"]["temp"],
+                "feels_like": item["main"].get("feels_like", item["main"]["temp"]),
+                "humidity": item["main"]["humidity"],
+                "wind_speed": item["wind"]["speed"],
+                "condition": item["weather"][0]["main"],
+                "rain": (
+                    1
+                    if any(k in item and item[k] for k in ("rain",))
+                    or item["weather"][0]["main"] in ["Rain", "Thunderstorm"]
+                    else 0
+                ),
+            }
+            for item in items
+        ]
+    )
+    df["date"] = pd.to_datetime(df["dt_txt"]).dt.date
+    today = pd.Timestamp(today).date() if today else pd.Timestamp.now().date()
+    df_future = df[df["date"] > today]
+    if df_future.empty:
+        df_future = df
+
+    days_agg = []
+    for d in sorted(df_future["date"].unique())[:days]:
+        sub = df_future[df_future["date"] == d]
+        month = pd.to_datetime(int(sub["dt"].iloc[0]), unit="s").month
+        days_agg.append(
+            {
+                "date": str(d),
+                "temp_c": float(sub["temp"].mean()),
+                "feels_like_c": float(sub["feels_like"].mean()),
+                "humidity": float(sub["humidity"].mean()),
+                "wind_speed": float(sub["wind_speed"].mean()),
+                "condition": (
+                    sub["condition"].mode()[0]
+                    if not sub["condition"].mode().empty
+                    else sub["condition"].iloc[0]
+                ),
+                "rain": int(sub["rain"].max() > 0),
+                "timestamp": int(sub["dt"].iloc[0]),
+                "season": ["Winter", "Spring", "Summer", "Autumn"][month % 12 // 3],
+            }
+        )
+    return days_agg
+
+
+def synthetic_forecast(start, slots=40, seed=0):
+    """A 5-day / 3-hour payload shaped like OpenWeather's /forecast `list`."""
+    import random
+
+    rnd = random.Random(seed)
+    items = []
+    for i in range(slots):
+        ts = start + i * 10800
+        cond = rnd.choice(["Clear", "Clouds", "Rain", "Snow", "Thunderstorm"])
+        item = {
+            "dt": ts,
+            "dt_txt": datetime.fromtimestamp(ts, timezone.utc).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            "main": {
+                "temp": rnd.uniform(-10, 40),
+                "feels_like": rnd.uniform(-12, 42),
+                "humidity": rnd.randint(20, 100),
+            },
+            "wind": {"speed": rnd.uniform(0, 15)},
+            "weather": [{"main": cond}],
+        }
+        if rnd.random() < 0.2:
+            item["rain"] = {"3h": rnd.uniform(0, 2)}
+        items.append(item)
+    return items
+
+
+def time_per_call(fn, items, days, today, repeat):
+    fn(items, days=days, today=today)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(items, days=days, today=today)
+    return (time.perf_counter() - start) / repeat
+
+
+def same_days(a, b):
+    if len(a) != len(b):
+        return False
+    for x, y in zip(a, b):
+        for k, v in x.items():
+            if isinstance(v, float) and abs(v - y[k]) > 1e-9:
+                return False
+            if not isinstance(v, float) and v != y[k]:
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--days", type=int, default=3)
+    args = parser.parse_args()
+
+    start = int(time.time()) // 10800 * 10800
+    today = datetime.now().date().isoformat()
+    for seed in range(50):
+        items = synthetic_forecast(start, seed=seed)
+        ref = reference_aggregate(items, args.days, today)
+        assert same_days(ref, aggregate_forecast_days(items, args.days, today))
+        assert same_days(ref, aggregate_forecast_days_pandas(items, args.days, today))
+    print("✔ grouped pandas and NumPy match the reference on 50 payloads")
+
+    items = synthetic_forecast(start)
+    timings = {
+        name: time_per_call(fn, items, args.days, today, args.repeat)
+        for name, fn in [
+            ("reference (per-date filter)", reference_aggregate),
+            ("pandas groupby", aggregate_forecast_days_pandas),
+            ("numpy single pass", aggregate_forecast_days),
+        ]
+    }
+    base = timings["reference (per-date filter)"]
+    for name, t in timings.items():
+        print(f"{name:<28} {t * 1e6:9.1f} µs/call   {base / t:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Forecast inference: one prediction per day vs one batched pass over all days.
+
+    cd backend && python -m benchmarks.forecast_inference --days 3
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("OPENWEATHER_KEY", "benchmark")  # app refuses to import without
+# the outfit memo would answer every timed call after the warm-up, so neither
+# path would run inference
+os.environ["OUTFIT_MEMO"] = "0"
+import app  # noqa: E402
+
+DAYS = [
+    app.model_input_row(3.5, 80, 6.1, 1, "female", 12, "Mon", "Winter", "Rain"),
+    app.model_input_row(12.0, 55, 3.2, 0, "female", 12, "Tue", "Winter", "Clouds"),
+    app.model_input_row(27.3, 40, 1.5, 0, "female", 12, "Wed", "Winter", "Clear"),
+]
+
+
+def per_day(rows):
+    return [app.predict_from_models(row) for row in rows]
+
+
+def batched(rows):
+    return app.predict_outfits(rows)
+
+
+def time_per_call(fn, rows, repeat):
+    fn(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(rows)
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--days", type=int, default=3, choices=[1, 2, 3])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = DAYS[: args.days]
+    assert per_day(rows) == batched(rows)
+    loop = time_per_call(per_day, rows, args.repeat)
+    batch = time_per_call(batched, rows, args.repeat)
+    print(f"per-day loop : {loop * 1e3:7.2f} ms/request")
+    print(f"batched      : {batch * 1e3:7.2f} ms/request   {loop / batch:4.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+Load test: the FastAPI app against a local fake OpenWeather server.
+
+Starts benchmarks/fake_openweather.py and the app (OPENWEATHER_BASE_URL pointed
+at the fake) under uvicorn, drives /outfit and /forecast, and reports
+throughput, p50 / p95 / p99 / max latency and error rates per endpoint. Results
+go to JSON (and PNG figures with --figures), and a run can be compared against
+a stored baseline; with --max-regression the exit status is 1 when p95 / p99
+latency grows or throughput drops by more than that fraction.
+
+With --rate requests are sent open-loop at that rate (latency counted from each
+request's scheduled start, so queueing behind --concurrency in-flight requests
+is included); without it, --concurrency workers send back to back.
+
+    cd backend && python -m benchmarks.load_test --duration 20 --concurrency 32
+    cd backend && python -m benchmarks.load_test --rate 200 --upstream-latency-ms 80 \\
+        --upstream-error-rate 0.02 --cache-ttl 0 --baseline results/baseline.json
+    cd backend && python -m benchmarks.load_test --target http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import numpy as np
+
+GENDERS = ["male", "female", "baby"]
+PERCENTILES = (50, 95, 99)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(module, port, env, workers=1):
+    cmd = [sys.executable, "-m", "uvicorn", module, "--port", str(port)]
+    cmd += ["--log-level", "warning", "--workers", str(workers)]
+    return subprocess.Popen(cmd, env={**os.environ, **env})
+
+
+def wait_ready(url, proc, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout} s")
+
+
+def request_plan(args):
+    """Endless (endpoint, path) stream drawn from the seeded --mix."""
+    rng = random.Random(args.seed)
+    cities = [f"City{i:04d}" for i in range(args.cities)]
+    endpoints, weights = zip(*args.mix.items())
+    while True:
+        endpoint = rng.choices(endpoints, weights)[0]
+        yield endpoint, f"/{endpoint}/{rng.choice(cities)}?gender={rng.choice(GENDERS)}"
+
+
+async def drive(base_url, args):
+    """Send the load; returns [(endpoint, start offset s, latency s, status)]."""
+    results = []
+    limits = httpx.Limits(max_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    plan = request_plan(args)
+
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=timeout
+    ) as client:
+        t0 = time.perf_counter()
+
+        async def one(endpoint, path, scheduled):
+            try:
+                r = await client.get(path)
+                status = r.status_code
+            except httpx.TimeoutException:
+                status = "timeout"
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            done = time.perf_counter()
+            results.append((endpoint, scheduled - t0, done - scheduled, status))
+
+        if args.rate:
+            # open loop: request i starts at i / rate, whatever is in flight
+            gate = asyncio.Semaphore(args.concurrency)
+
+            async def scheduled_request(i, endpoint, path):
+                scheduled = t0 + i / args.rate
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                async with gate:
+                    await one(endpoint, path, scheduled)
+
+            n = int(args.rate * args.duration)
+            await asyncio.gather(
+                *(
+                    scheduled_request(i, e, p)
+                    for i, (e, p) in enumerate(itertools.islice(plan, n))
+                )
+            )
+        else:
+            stop = t0 + args.duration
+
+            async def worker():
+                while time.perf_counter() < stop:
+                    endpoint, path = next(plan)
+                    await one(endpoint, path, time.perf_counter())
+
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return results
+
+
+def summarize(results, elapsed):
+    """Per-endpoint (and "all") counts, throughput, error rate, latency in ms."""
+    groups = {"all": results}
+    for endpoint in sorted({r[0] for r in results}):
+        groups[endpoint] = [r for r in results if r[0] == endpoint]
+    summary = {}
+    for name, rows in groups.items():
+        latency = np.array([r[2] for r in rows]) * 1e3
+        statuses = Counter(str(r[3]) for r in rows)
+        errors = sum(n for s, n in statuses.items() if s != "200")
+        summary[name] = {
+            "requests": len(rows),
+            "throughput_rps": round(len(rows) / elapsed, 2),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "status": dict(sorted(statuses.items())),
+            "latency_ms": (
+                {
+                    **{
+                        f"p{p}": round(float(np.percentile(latency, p)), 2)
+                        for p in PERCENTILES
+                    },
+                    "max": round(float(latency.max()), 2),
+                    "mean": round(float(latency.mean()), 2),
+                }
+                if rows
+                else {}
+            ),
+        }
+    return summary
+
+
+def compare(report, baseline, max_regression=None):
+    """Print current vs baseline per endpoint; return the regressions found."""
+    regressions = []
+    print(f"\nvs baseline from {baseline.get('started', '?')}")
+    differ = [
+        k
+        for k in ("duration", "concurrency", "rate", "mix", "upstream_latency_ms")
+        if baseline.get("config", {}).get(k) != report["config"].get(k)
+    ]
+    if differ:
+        print(f"  note: baseline was run with different {', '.join(differ)}")
+    for name, cur in report["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base or not cur["requests"] or not base["requests"]:
+            continue
+        pairs = [("throughput_rps", cur["throughput_rps"], base["throughput_rps"])]
+        pairs += [
+            (k, cur["latency_ms"][k], base["latency_ms"][k])
+            for k in ("p50", "p95", "p99", "max")
+        ]
+        cells = []
+        for key, now, then in pairs:
+            change = (now - then) / then if then else 0.0
+            cells.append(f"{key} {then:g} -> {now:g} ({change:+.0%})")
+            worse = -change if key == "throughput_rps" else change
+            if (
+                max_regression is not None
+                and key in ("throughput_rps", "p95", "p99")
+                and worse > max_regression
+            ):
+                regressions.append(f"{name} {key} {change:+.0%}")
+        cells.append(f"errors {base['error_rate']:.2%} -> {cur['error_rate']:.2%}")
+        print(f"  {name:<9} " + "   ".join(cells))
+    return regressions
+
+
+def plot(results, summary, out_dir):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(out_dir, exist_ok=True)
+    endpoints = [e for e in summary if e != "all"]
+
+    plt.figure(figsize=(9, 5))
+    for endpoint in endpoints:
+        latency = [r[2] * 1e3 for r in results if r[0] == endpoint]
+        plt.hist(latency, bins=60, alpha=0.6, label=f"/{endpoint}")
+    plt.xlabel("Latency (ms)")
+    plt.ylabel("Requests")
+    plt.title("Latency distribution")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(os.path.join(out_dir, "load_latency_hist.png"), dpi=150)
+    plt.close()
+
+    fig, (ax_lat, ax_rps) = plt.subplots(2, 1, figsize=(10, 7), sharex=True)
+    for endpoint in endpoints:
+        rows = [r for r in results if r[0] == endpoint]
+        ax_lat.scatter(
+            [r[1] for r in rows], [r[2] * 1e3 for r in rows], s=2, label=f"/{endpoint}"
+        )
+    ax_lat.set_ylabel("Latency (ms)")
+    ax_lat.set_yscale("log")
+    ax_lat.legend(markerscale=5)
+    seconds = np.floor([r[1] for r in results]).astype(int)
+    counts = np.bincount(seconds) if len(seconds) else []
+    ax_rps.plot(np.arange(len(counts)), counts)
+    ax_rps.set_ylabel("Requests started / s")
+    ax_rps.set_xlabel("Seconds into run")
+    fig.suptitle("Latency and throughput over time")
+    fig.tight_layout()
+    fig.savefig(os.path.join(out_dir, "load_timeline.png"), dpi=150)
+    plt.close(fig)
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ("outfit", "forecast"):
+            raise argparse.ArgumentTypeError(f"unknown endpoint {endpoint}")
+        mix[endpoint] = float(weight or 1)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--duration", type=float, default=20, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--rate", type=float, help="requests/s (open loop)")
+    parser.add_argument("--mix", type=parse_mix, default="outfit=3,forecast=1")
+    parser.add_argument("--cities", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=20)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--cache-ttl", type=float, help="app weather cache TTL (s)")
+    parser.add_argument("--app-workers", type=int, default=1)
+    parser.add_argument(
+        "--cache-backend",
+        choices=["memory", "sqlite"],
+        help="app WEATHER_CACHE_BACKEND (sqlite: a fresh file per run)",
+    )
+    parser.add_argument("--target", help="test a running app instead of starting one")
+    parser.add_argument("--out", default="results/load_test.json")
+    parser.add_argument("--figures", help="directory for PNG figures")
+    parser.add_argument("--baseline", help="earlier --out JSON to compare against")
+    parser.add_argument("--save-baseline", help="also write this run here")
+    parser.add_argument("--max-regression", type=float)
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+
+    procs, fake_url, scratch = [], None, None
+    try:
+        if args.target:
+            base_url = args.target.rstrip("/")
+        else:
+            fake_port, app_port = free_port(), free_port()
+            fake_url = f"http://127.0.0.1:{fake_port}"
+            fake_env = {
+                "FAKE_OW_LATENCY_MS": str(args.upstream_latency_ms),
+                "FAKE_OW_JITTER_MS": str(args.upstream_jitter_ms),
+                "FAKE_OW_ERROR_RATE": str(args.upstream_error_rate),
+                "FAKE_OW_SEED": str(args.seed),
+            }
+            app_env = {"OPENWEATHER_BASE_URL": fake_url, "OPENWEATHER_KEY": "load-test"}
+            if args.cache_ttl is not None:
+                app_env["CURRENT_CACHE_TTL"] = app_env["FORECAST_CACHE_TTL"] = str(
+                    args.cache_ttl
+                )
+            if args.cache_backend:
+                app_env["WEATHER_CACHE_BACKEND"] = args.cache_backend
+                scratch = tempfile.mkdtemp(prefix="load-test-")
+                app_env["WEATHER_CACHE_PATH"] = os.path.join(scratch, "weather.sqlite")
+            procs.append(
+                start_server("benchmarks.fake_openweather:app", fake_port, fake_env)
+            )
+            wait_ready(f"{fake_url}/stats", procs[-1])
+            procs.append(start_server("app:app", app_port, app_env, args.app_workers))
+            base_url = f"http://127.0.0.1:{app_port}"
+            wait_ready(f"{base_url}/cache/stats", procs[-1])
+
+        started = datetime.now(timezone.utc)
+        t0 = time.perf_counter()
+        results = asyncio.run(drive(base_url, args))
+        elapsed = time.perf_counter() - t0
+        upstream = httpx.get(f"{fake_url}/stats").json() if fake_url else None
+    finally:
+        for proc in reversed(procs):
+            proc.terminate()
+            proc.wait()
+        if scratch:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+    config = {k: v for k, v in vars(args).items() if k not in ("out", "save_baseline")}
+    report = {
+        "started": started.isoformat(timespec="seconds"),
+        "elapsed_s": round(elapsed, 2),
+        "config": config,
+        "endpoints": summarize(results, elapsed),
+        "upstream_requests": upstream,
+        # per-request latency (ms) for plotting elsewhere (generate_figures.py)
+        "samples_ms": {
+            endpoint: [round(r[2] * 1e3, 2) for r in results if r[0] == endpoint]
+            for endpoint in args.mix
+        },
+    }
+
+    print(f"{len(results)} requests in {elapsed:.1f} s against {base_url}")
+    for name, s in report["endpoints"].items():
+        lat = s["latency_ms"]
+        print(
+            f"  {name:<9} {s['throughput_rps']:8.1f} req/s   "
+            + "  ".join(f"{k} {v:8.1f} ms" for k, v in lat.items() if k != "mean")
+            + f"   errors {s['error_rate']:.2%}"
+        )
+    if upstream is not None:
+        print(f"  upstream requests: {upstream}")
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Results → {path}")
+    if args.figures:
+        plot(results, report["endpoints"], args.figures)
+        print(f"Figures → {args.figures}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        if regressions:
+            print("Regressions beyond --max-regression: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Per-request cost of the /metrics instrumentation.
+
+Replays the observations one /forecast request makes (request timer, upstream
+call, aggregation, encode, predict, tips) against an enabled and a disabled
+Registry, then times an ASGI request through RequestTimer against the bare
+app. Also times rendering a scrape.
+
+    cd backend && python -m benchmarks.metrics_overhead
+"""
+
+import argparse
+import asyncio
+import time
+
+from metrics import Registry, RequestTimer
+
+
+def request_observations(registry):
+    request = registry.histogram("request", "", ("route", "method", "status"))
+    upstream = registry.histogram("upstream", "", ("endpoint", "status"))
+    aggregation = registry.histogram("aggregation", "")
+    encode = registry.histogram("encode", "")
+    predict = registry.histogram("predict", "", ("label",))
+    tips = registry.histogram("tips", "")
+
+    def one_request():
+        started = time.perf_counter()
+        stage = time.perf_counter()
+        upstream.since(stage, "forecast", "200")
+        stage = time.perf_counter()
+        aggregation.since(stage)
+        stage = time.perf_counter()
+        encode.observe(time.perf_counter() - stage)
+        stage = time.perf_counter()
+        predict.observe(time.perf_counter() - stage, "all")
+        stage = time.perf_counter()
+        tips.since(stage)
+        request.since(started, "/forecast/{city}", "GET", "200")
+
+    return one_request
+
+
+def per_call(fn, n):
+    fn()
+    started = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - started) / n
+
+
+async def asgi_per_call(app, n):
+    class Route:
+        path = "/forecast/{city}"
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(n):
+        scope = {"type": "http", "method": "GET", "route": Route}
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / n
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--n", type=int, default=200_000)
+    args = parser.parse_args()
+
+    for enabled in (True, False):
+        registry = Registry(enabled=enabled)
+        cost = per_call(request_observations(registry), args.n)
+        state = "enabled " if enabled else "disabled"
+        print(f"stage observations, {state}  {cost * 1e6:6.2f} µs / request")
+
+    registry = Registry()
+    timed = RequestTimer(bare_app, registry.histogram("r", "", ("a", "b", "c")))
+    bare = asyncio.run(asgi_per_call(bare_app, args.n))
+    wrapped = asyncio.run(asgi_per_call(timed, args.n))
+    print(f"RequestTimer middleware        {(wrapped - bare) * 1e6:6.2f} µs / request")
+
+    registry = Registry()
+    request_observations(registry)()
+    started = time.perf_counter()
+    text = registry.render()
+    print(
+        f"render                         {(time.perf_counter() - started) * 1e3:6.2f} ms "
+        f"({len(text)} bytes)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Synthetic dataset generation: per-row rule evaluation vs the label table.
+
+The reference labels every row with `get_categories` and the selectors, as the
+original script did; `synthetic_30k.generate` looks the labels up by array
+index. Checks both agree, then reports rows per second as N grows, and Parquet
+throughput per worker count (checking every worker count writes the same
+shards).
+
+    cd backend && python -m benchmarks.synthetic_generation --sizes 30000 1000000
+    cd backend && python -m benchmarks.synthetic_generation --sizes --workers 1 2 4
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import synthetic_30k as synth
+
+
+def reference_labels(data):
+    rows = zip(data.temperature, data.weather_condition, data.gender)
+    cats = [synth.get_categories(t, w, g) for t, w, g in rows]
+    cond = list(data.weather_condition)
+    return {
+        "top_label": [synth.select_top(c) for c in cats],
+        "bottom_label": [synth.select_bottom(c) for c in cats],
+        "footwear_label": [synth.select_footwear(c, w) for c, w in zip(cats, cond)],
+        "accessory_label": [synth.select_accessory(c, w) for c, w in zip(cats, cond)],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[30_000, 1_000_000, 10_000_000]
+    )
+    parser.add_argument("--reference-max", type=int, default=300_000)
+    parser.add_argument("--workers", type=int, nargs="*", default=[])
+    parser.add_argument("--parquet-rows", type=int, default=10_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    table = synth.build_label_table()
+    check = synth.generate(20_000, seed=7, table=table)
+    for lbl, values in reference_labels(check).items():
+        assert np.array_equal(check[lbl].astype(str).to_numpy(), values), lbl
+    print("✔ table labels == per-row rules on 20000 rows")
+
+    for n in args.sizes:
+        start = time.perf_counter()
+        data = synth.generate(n, table=table, with_categories=False)
+        vectorized = time.perf_counter() - start
+        line = f"{n:>11,} rows: table {n / vectorized / 1e6:7.2f} M rows/s"
+        if n <= args.reference_max:
+            start = time.perf_counter()
+            reference_labels(data)
+            per_row = time.perf_counter() - start
+            line += f"   per-row labels alone {n / per_row / 1e6:7.3f} M rows/s"
+        print(line)
+        del data
+
+    parts = None
+    for workers in args.workers:
+        with tempfile.TemporaryDirectory() as out:
+            start = time.perf_counter()
+            manifest = synth.write_parquet(
+                args.parquet_rows, out, chunk_rows=args.chunk_rows, workers=workers
+            )
+            took = time.perf_counter() - start
+        if parts is None:
+            parts = manifest["parts"]
+        assert manifest["parts"] == parts, f"{workers} workers wrote other shards"
+        print(
+            f"parquet {args.parquet_rows:,} rows, {workers:>2} worker(s): "
+            f"{args.parquet_rows / took / 1e6:6.2f} M rows/s  ({took:.1f} s)"
+        )
+    if parts is not None:
+        print(
+            f"✔ identical shards for {args.workers} workers (cpu_count {os.cpu_count()})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Outfit tips: the original keyword-scanning generator vs the compiled TipsEngine.
+
+Checks both return identical tips for every label combination in the model
+bundle across genders, temperature bands and rain / snow weather, then times
+tips for a forecast-sized batch.
+
+    cd backend && python -m benchmarks.tips
+"""
+
+import argparse
+import itertools
+import math
+import os
+import time
+
+import numpy as np
+
+from tips import TipsEngine
+
+PARTS = ["top", "bottom", "footwear", "accessory"]
+GENDERS = ["male", "female", "baby"]
+# one reading per band, the band edges themselves, no reading and NaN
+TEMPS = [None, -12.0, 5.0, 5.5, 6.9, 7.0, 19.9, 20.0, 25.9, 26.0, 38.0, math.nan]
+WEATHERS = [
+    {"weather_condition": "Clear", "rain": 0},
+    {"weather_condition": "Clouds", "rain": 1},
+    {"weather_condition": "Rain", "rain": 0},
+    {"weather_condition": "Snow", "rain": 0},
+    {"weather_condition": "Thunderstorm", "rain": 1},
+    {"weather_condition": "Snow", "rain": 1},
+    {"snow": True},
+]
+
+
+def reference_tips(outfit, gender, weather):
+    # original app.generate_tips_from_outfit, kept verbatim for comparison
+    tips = []
+
+    # WEATHER & OUTFIT EXTRACTION
+    temp = weather.get("temperature_c", weather.get("temp_c"))
+    cond = weather.get("weather_condition", "").lower()
+
+    is_rain = weather.get("rain", False) or "rain" in cond
+    is_snow = weather.get("snow", False) or "snow" in cond
+
+    top = outfit.get("top", "").lower()
+    bottom = outfit.get("bottom", "").lower()
+    footwear = outfit.get("footwear", "").lower()
+    accessory = outfit.get("accessory", "").lower()
+
+    # TOP TIPS
+    top_tips = []
+
+    if any(
+        k in top
+        for k in [
+            "puffer_jacket",
+            "quilted_jacket",
+            "insulated_parka",
+            "coat",
+            "thermal",
+            "hoodie",
+            "sweater",
+        ]
+    ):
+        top_tips.append(f"{top} provides warmth and is suitable for cold weather.")
+
+    elif any(k in top for k in ["tshirt", "shirt"]):
+        top_tips.append(
+            f"{top.capitalize()} is suitable for mild or warm temperatures."
+        )
+
+    else:
+        top_tips.append(
+            f"{top.capitalize()} can be worn depending on personal comfort."
+        )
+
+    tips.extend(top_tips)
+
+    # BOTTOM TIPS
+    bottom_tips = []
+
+    if "skirt" in bottom and gender != "female":
+        bottom_tips.append(f"A {bottom} may feel cold for {gender}.")
+
+    elif "shorts" in bottom and (temp is not None and temp < 20):
+        bottom_tips.append("Shorts may feel chilly at this temperature.")
+
+    else:
+        bottom_tips.append(f"{bottom.capitalize()} is suitable for current weather.")
+
+    tips.extend(bottom_tips)
+
+    # FOOTWEAR TIPS
+    footwear_tips = []
+
+    if is_snow:
+        if not any(k in footwear for k in ["boot", "snow", "insulated", "waterproof"]):
+            footwear_tips.append(
+                "Snowy conditions — insulated waterproof boots are recommended."
+            )
+        else:
+            footwear_tips.append(f"{footwear.capitalize()} are appropriate for snow.")
+
+    elif is_rain:
+        if not any(
+            k in footwear for k in ["gumboot", "rainboot", "waterproof", "boot"]
+        ):
+            footwear_tips.append(
+                "Rainy weather — waterproof footwear will keep your feet dry."
+            )
+        else:
+            footwear_tips.append(f"{footwear.capitalize()} are suitable for rain.")
+
+    else:
+        footwear_tips.append(f"{footwear.capitalize()} are suitable for daily use.")
+
+    tips.extend(footwear_tips)
+
+    # ACCESSORIES TIPS
+    accessory_tips = []
+
+    # Weather overrides (always show even if accessory = none)
+    if is_rain:
+        accessory_tips.append("Rainy weather — carry an umbrella or wear a raincoat.")
+
+    elif is_snow:
+        accessory_tips.append(
+            "Snowy weather — stay warm: wear sherpa topi, gloves, and a scarf."
+        )
+
+    # Normal accessory rules (ONLY if accessory exists and is not "none")
+    elif accessory and accessory != "none":
+        if temp is not None:
+
+            # Cold
+            if temp <= 5:
+                if not any(
+                    k in accessory for k in ["scarf", "gloves", "hat", "beanie"]
+                ):
+                    accessory_tips.append(
+                        "Add scarf, gloves, or a warm hat for very cold weather."
+                    )
+                else:
+                    accessory_tips.append(f"Wear {accessory} to keep warm.")
+
+            # Hot
+            elif temp >= 26:
+                accessory_tips.append(
+                    f"Wear {accessory} to stay cool and protected from sun."
+                )
+
+            # Mild
+            else:
+                accessory_tips.append(
+                    f"{accessory.capitalize()} can complement your outfit."
+                )
+
+    if accessory_tips:
+        tips.extend(accessory_tips)
+
+    # LAYERING ADVICE
+    if temp is not None and temp < 7:
+        tips.append(
+            "It's too cold — layering is recommended: base layer + insulating layer + outer shell."
+        )
+
+    return tips
+
+
+def vocabulary(bundle):
+    with np.load(os.path.join(bundle, "tables.npz")) as tables:
+        return {p: tables[f"classes__{p}_label"].tolist() for p in PARTS}
+
+
+def cases(vocab):
+    for labels in itertools.product(*(vocab[p] for p in PARTS)):
+        outfit = dict(zip(PARTS, labels))
+        for gender, temp, weather in itertools.product(GENDERS, TEMPS, WEATHERS):
+            w = dict(weather)
+            if temp is not None:
+                w["temperature_c" if len(w) % 2 else "temp_c"] = temp
+            yield outfit, gender, w
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--bundle", default="models/bundle")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    vocab = vocabulary(args.bundle)
+    engine = TipsEngine(vocab, maxsize=0)  # no memo: every call runs the rules
+    n = 0
+    for outfit, gender, weather in cases(vocab):
+        expected = reference_tips(outfit, gender, weather)
+        assert engine.tips(outfit, gender, weather) == expected, (outfit, weather)
+        n += 1
+    print(f"✔ identical tips for {n} outfit / gender / weather combinations")
+
+    items = [
+        (
+            {
+                "top": "sweater",
+                "bottom": "jeans",
+                "footwear": "boots",
+                "accessory": "scarf",
+            },
+            "female",
+            {"temperature_c": 4.0, "rain": 1},
+        ),
+        (
+            {
+                "top": "light_jacket",
+                "bottom": "jeans_or_chinos",
+                "footwear": "sneakers",
+                "accessory": "cap",
+            },
+            "female",
+            {"temperature_c": 14.2, "rain": 0},
+        ),
+        (
+            {
+                "top": "tshirt",
+                "bottom": "shorts",
+                "footwear": "sandals",
+                "accessory": "sunglasses",
+            },
+            "female",
+            {"temperature_c": 29.5, "rain": 0},
+        ),
+    ]
+    memo = TipsEngine(vocab)
+    for name, fn in [
+        ("original", lambda: [reference_tips(*item) for item in items]),
+        ("rule table", lambda: engine.tips_batch(items)),
+        ("memoized", lambda: memo.tips_batch(items)),
+    ]:
+        fn()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            fn()
+        took = (time.perf_counter() - start) / args.repeat
+        print(f"{name:<11}: {took * 1e6:7.1f} µs per {len(items)}-day forecast")
+
+
+if __name__ == "__main__":
+    main()
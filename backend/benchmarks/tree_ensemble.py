@@ -0,0 +1,51 @@
+"""
+NumPy tree-ensemble evaluator vs XGBoost predict for the four label models.
+
+Checks both backends pick the same class on random inputs and times single-row
+and batch scoring of all four labels.
+
+    cd backend && python -m benchmarks.tree_ensemble
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.feature_encoding import random_rows, time_per_call
+from model_bundle import MANIFEST, load_bundle
+from predictor import load_pipelines_predictor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=100)
+    parser.add_argument("--bundle", default="models/bundle")
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join(args.bundle, MANIFEST)):
+        predictor = load_bundle(args.bundle, backend="xgboost")
+    else:
+        predictor = load_pipelines_predictor("models")
+    ensemble = predictor.ensemble or predictor.export_ensemble()
+    X = predictor.encode(random_rows(args.rows))
+    expected = predictor.predict_codes(X, backend="xgboost")
+    for lbl, codes in ensemble.predict_codes(X).items():
+        assert np.array_equal(codes, expected[lbl]), lbl
+    print(f"✔ identical argmax on {args.rows} random rows for all labels")
+
+    for n in (1, 3, 100):
+        batch = X[:n]
+        xgb = time_per_call(
+            lambda: predictor.predict_codes(batch, backend="xgboost"), args.repeat
+        )
+        tree = time_per_call(lambda: ensemble.predict_codes(batch), args.repeat)
+        print(
+            f"{n:>4} rows: xgboost {xgb * 1e6:9.1f} µs   numpy {tree * 1e6:9.1f} µs"
+            f"   {xgb / tree:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
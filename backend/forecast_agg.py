@@ -0,0 +1,163 @@
+"""
+Daily aggregation of the OpenWeather 5-day / 3-hour forecast.
+
+A forecast payload only holds ~40 slots, so DataFrame construction dominated the
+cost of the original per-date filtering. `aggregate_forecast_days` does the whole
+aggregation in one grouped NumPy pass; `aggregate_forecast_days_pandas` is the
+equivalent single groupby, kept for comparison (pandas is imported lazily).
+"""
+
+from datetime import date
+
+import numpy as np
+
+# month (1-12) -> season; index 0 unused
+SEASON_BY_MONTH = np.array(
+    [
+        "",
+        "Winter",
+        "Winter",
+        "Spring",
+        "Spring",
+        "Spring",
+        "Summer",
+        "Summer",
+        "Summer",
+        "Autumn",
+        "Autumn",
+        "Autumn",
+        "Winter",
+    ],
+    dtype=object,
+)
+
+NUMERIC_FIELDS = ["temp_c", "feels_like_c", "humidity", "wind_speed"]
+
+
+def _slot_values(item):
+    main = item["main"]
+    return (
+        main["temp"],
+        main.get("feels_like", main["temp"]),
+        main["humidity"],
+        item["wind"]["speed"],
+    )
+
+
+def _slot_rain(item):
+    return (
+        1
+        if any(k in item and item[k] for k in ("rain",))
+        or item["weather"][0]["main"] in ["Rain", "Thunderstorm"]
+        else 0
+    )
+
+
+def _months_utc(timestamps):
+    months = np.asarray(timestamps, dtype="datetime64[s]").astype("datetime64[M]")
+    return months.astype(np.int64) % 12 + 1
+
+
+def aggregate_forecast_days(items, days=3, today=None):
+    """
+    Aggregate forecast slots to calendar days (date taken from `dt_txt`).
+    Days after `today` (local date, ISO string) are kept; if there are none, every
+    day in the payload is used. Returns up to `days` daily dicts with mean
+    temperature / feels-like / humidity / wind, the modal condition (ties go to
+    the alphabetically first, as with pandas' mode), a rain flag, and the first
+    slot's timestamp and season.
+    """
+    if not items:
+        return []
+    today = today or date.today().isoformat()
+
+    n = len(items)
+    dts = np.fromiter((it["dt"] for it in items), dtype=np.int64, count=n)
+    values = np.array([_slot_values(it) for it in items], dtype=np.float64)
+    rain = np.fromiter((_slot_rain(it) for it in items), dtype=np.int64, count=n)
+    dates = np.array([it["dt_txt"][:10] for it in items])
+    conds = np.array([it["weather"][0]["main"] for it in items])
+
+    uniq_dates, first_idx, group = np.unique(
+        dates, return_index=True, return_inverse=True
+    )
+    keep = np.flatnonzero(uniq_dates > today)
+    if keep.size == 0:
+        keep = np.arange(uniq_dates.size)
+    keep = keep[:days]
+
+    n_groups = uniq_dates.size
+    counts = np.bincount(group, minlength=n_groups)
+    sums = np.zeros((n_groups, values.shape[1]))
+    np.add.at(sums, group, values)
+    means = sums / counts[:, None]
+
+    rain_max = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(rain_max, group, rain)
+
+    uniq_conds, cond_code = np.unique(conds, return_inverse=True)
+    cond_counts = np.zeros((n_groups, uniq_conds.size), dtype=np.int64)
+    np.add.at(cond_counts, (group, cond_code), 1)
+    modal = uniq_conds[cond_counts.argmax(axis=1)]
+
+    first_dt = dts[first_idx]
+    seasons = SEASON_BY_MONTH[_months_utc(first_dt)]
+
+    return [
+        {
+            "date": str(uniq_dates[g]),
+            "temp_c": float(means[g, 0]),
+            "feels_like_c": float(means[g, 1]),
+            "humidity": float(means[g, 2]),
+            "wind_speed": float(means[g, 3]),
+            "condition": str(modal[g]),
+            "rain": int(rain_max[g] > 0),
+            "timestamp": int(first_dt[g]),
+            "season": seasons[g],
+        }
+        for g in keep
+    ]
+
+
+def aggregate_forecast_days_pandas(items, days=3, today=None):
+    """Same contract as `aggregate_forecast_days`, as a single pandas groupby."""
+    import pandas as pd
+
+    if not items:
+        return []
+    today = today or date.today().isoformat()
+
+    df = pd.DataFrame([_slot_values(it) for it in items], columns=NUMERIC_FIELDS)
+    df["dt"] = [it["dt"] for it in items]
+    df["rain"] = [_slot_rain(it) for it in items]
+    df["date"] = [it["dt_txt"][:10] for it in items]
+    df["condition"] = [it["weather"][0]["main"] for it in items]
+
+    future = df[df["date"] > today]
+    if future.empty:
+        future = df
+
+    grouped = future.groupby("date", sort=True)
+    agg = grouped[NUMERIC_FIELDS].mean()
+    agg["rain"] = grouped["rain"].max()
+    agg["timestamp"] = grouped["dt"].first()
+    # condition columns come out sorted, so idxmax breaks ties alphabetically
+    # like pandas' mode()
+    modal = future.groupby(["date", "condition"]).size().unstack(fill_value=0).idxmax(1)
+    agg = agg.head(days)
+    seasons = SEASON_BY_MONTH[_months_utc(agg["timestamp"].to_numpy())]
+
+    return [
+        {
+            "date": d,
+            "temp_c": float(row.temp_c),
+            "feels_like_c": float(row.feels_like_c),
+            "humidity": float(row.humidity),
+            "wind_speed": float(row.wind_speed),
+            "condition": modal[d],
+            "rain": int(row.rain > 0),
+            "timestamp": int(row.timestamp),
+            "season": season,
+        }
+        for (d, row), season in zip(agg.iterrows(), seasons)
+    ]
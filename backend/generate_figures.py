@@ -1,178 +1,353 @@
+"""
+Report figures for the outfit models and the synthetic dataset.
+
+    cd backend && python generate_figures.py                    # every figure
+    cd backend && python generate_figures.py --only "cm_*" prf1_bar
+    cd backend && python generate_figures.py --list
+
+Predictions for all four targets come from one encoding pass and one batched
+predict per target. They are cached in data/cache, keyed by the model and
+dataset hashes, so re-rendering does not predict again. Each figure is drawn in
+a process pool from small precomputed inputs (counts, confusion matrices).
+"""
+
+import argparse
+import fnmatch
+import hashlib
+import json
 import os
-import pandas as pd
-import numpy as np
-import joblib
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")  # workers have no display
+
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 import seaborn as sns
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
-import requests
-import time
+
+from hashing import dataset_digest, sha256_file
+from model_bundle import MANIFEST, bundle_digest, load_bundle, read_manifest
+from predictor import FEATURES, LABELS, load_pipelines_predictor
 
 # ---------------- CONFIG ----------------
 CSV_PATH = "data/synthetic_30k.csv"
 MODEL_DIR = "models"
+BUNDLE_DIR = "models/bundle"
 OUTPUT_DIR = "figures"
+CACHE_DIR = "data/cache"
 API_TEST_URL = "http://localhost:8000/outfit/London?gender=male&unit=C"
+LOAD_RESULTS = "results/load_test.json"  # benchmarks/load_test.py output
+DPI = 300
 
 TARGETS = ["top", "bottom", "footwear", "accessory"]
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+# dataset column, title, palette, figure size
+DISTRIBUTIONS = {
+    "weather_condition_dist": (
+        "weather_condition",
+        "Weather Condition Distribution",
+        "pastel",
+        (7, 5),
+    ),
+    "rain_dist": ("rain", "Rain Distribution", "cool", (7, 5)),
+    "gender_dist": ("gender", "Gender Distribution", "Set2", (7, 5)),
+    "day_of_week_dist": ("day_of_week", "Day of Week Distribution", "muted", (10, 5)),
+}
+PREDICTION_FIGURES = ["accuracy_bar", *(f"cm_{t}" for t in TARGETS), "prf1_bar"]
+FIGURES = [
+    *PREDICTION_FIGURES,
+    *DISTRIBUTIONS,
+    *(f"{t}_label_dist" for t in TARGETS),
+    "latency_hist",
+]
 
-# ---------------- LOAD DATA & MODELS ----------------
-df = pd.read_csv(CSV_PATH)
 
-# Load label encoders and individual models
-label_encoders = joblib.load(os.path.join(MODEL_DIR, "global_label_encoders.pkl"))
-models = {
-    t: joblib.load(os.path.join(MODEL_DIR, f"{t}_label_model.pkl")) for t in TARGETS
-}
+# ---------------- PREDICTIONS ----------------
+def model_key(bundle_dir, model_dir):
+    """Content hash of the models: the bundle when present, else the pickles."""
+    if os.path.exists(os.path.join(bundle_dir, MANIFEST)):
+        return bundle_digest(read_manifest(bundle_dir))
+    pickles = ["global_label_encoders.pkl"] + [f"{lbl}_model.pkl" for lbl in LABELS]
+    return hashlib.sha256(
+        "".join(sha256_file(os.path.join(model_dir, p)) for p in pickles).encode()
+    ).hexdigest()
+
+
+def load_predictor(bundle_dir, model_dir):
+    if os.path.exists(os.path.join(bundle_dir, MANIFEST)):
+        return load_bundle(bundle_dir, backend="xgboost")
+    return load_pipelines_predictor(model_dir)
+
+
+def predictions(df, args):
+    """
+    {target: (true class codes, predicted class codes, classes)} over the whole
+    dataset, from the cache when the models and data are unchanged.
+    """
+    key = hashlib.sha256(
+        (model_key(args.bundle, args.models) + dataset_digest(args.data)).encode()
+    ).hexdigest()[:16]
+    path = os.path.join(args.cache_dir, f"predictions-{key}.npz")
+    if os.path.exists(path):
+        with np.load(path) as z:
+            print(f"Predictions loaded from {path}")
+            return {
+                t: (z[f"true__{t}"], z[f"pred__{t}"], z[f"classes__{t}"])
+                for t in TARGETS
+            }
+
+    started = time.perf_counter()
+    predictor = load_predictor(args.bundle, args.models)
+    X = predictor.encoder.encode_columns({f: df[f].to_numpy() for f in FEATURES})
+    codes = predictor.predict_codes(X, backend="xgboost")
+    preds = {}
+    for t in TARGETS:
+        classes = predictor.classes[t + "_label"]
+        true = pd.Categorical(df[t + "_label"], categories=classes).codes
+        preds[t] = (true, codes[t + "_label"], np.asarray(classes, dtype=str))
+    print(f"Predicted {len(df)} rows in {time.perf_counter() - started:.2f} s")
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    arrays = {}
+    for t, (true, pred, classes) in preds.items():
+        arrays.update(
+            {f"true__{t}": true, f"pred__{t}": pred, f"classes__{t}": classes}
+        )
+    with open(path + ".tmp", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(path + ".tmp", path)
+    print(f"Predictions cached → {path}")
+    return preds
+
+
+def category_counts(values, order=None):
+    """Row count per value, in countplot's default order unless given."""
+    if order is None:
+        order = pd.unique(values)
+        if pd.api.types.is_numeric_dtype(values):
+            order = np.sort(order)
+    return values.value_counts().reindex(order, fill_value=0)
+
+
+def load_test_latency(path):
+    """/outfit latencies (s) recorded by benchmarks/load_test.py, if it has run."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        samples = json.load(f).get("samples_ms", {}).get("outfit")
+    if samples:
+        print(f"Latency samples read from {path}")
+        return [ms / 1000 for ms in samples]
+    return None
+
+
+def measure_latency(url, calls=50):
+    import requests
+
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        try:
+            requests.get(url)
+        except Exception as e:
+            print("⚠ API call failed:", e)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+# ---------------- RENDERING (runs in worker processes) ----------------
+def render_accuracy(path, acc_df):
+    plt.figure(figsize=(8, 5))
+    sns.barplot(x="Garment", y="Accuracy", data=acc_df, palette="pastel")
+    plt.ylim(0, 1)
+    plt.title("Model Accuracy per Garment")
+    plt.ylabel("Accuracy")
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
 
-# Get raw feature columns used in preprocessor
-preprocessor = joblib.load(os.path.join(MODEL_DIR, "preprocessor.pkl"))
-FEATURE_COLS = preprocessor.feature_names_in_
-
-# ---------------- 1. ACCURACY TABLE & BAR CHART ----------------
-acc_list = []
-for tgt in TARGETS:
-    le = label_encoders[tgt + "_label"]
-    model = models[tgt]
-    X = df[FEATURE_COLS]  # raw features
-    y_true = df[tgt + "_label"]
-    y_true_encoded = le.transform(y_true)
-    y_pred_encoded = model.predict(X)
-    acc = accuracy_score(y_true_encoded, y_pred_encoded)
-    acc_list.append({"Garment": tgt.title(), "Accuracy": acc})
-
-acc_df = pd.DataFrame(acc_list)
-acc_df.to_csv(os.path.join(OUTPUT_DIR, "accuracy_table.csv"), index=False)
-print("✔ Accuracy table saved")
-
-# Plot accuracy bar chart
-plt.figure(figsize=(8, 5))
-sns.barplot(x="Garment", y="Accuracy", data=acc_df, palette="pastel")
-plt.ylim(0, 1)
-plt.title("Model Accuracy per Garment")
-plt.ylabel("Accuracy")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "accuracy_bar.png"), dpi=300)
-plt.close()
-print("✔ Accuracy bar chart saved")
-
-# ---------------- 2. CONFUSION MATRICES ----------------
-for tgt in TARGETS:
-    le = label_encoders[tgt + "_label"]
-    model = models[tgt]
-    X = df[FEATURE_COLS]
-    y_true_encoded = le.transform(df[tgt + "_label"])
-    y_pred_encoded = model.predict(X)
-    cm = confusion_matrix(y_true_encoded, y_pred_encoded)
 
+def render_confusion(path, title, cm, classes):
     plt.figure(figsize=(7, 6))
     sns.heatmap(
         cm,
         annot=True,
         fmt="d",
         cmap="Blues",
-        xticklabels=le.classes_,
-        yticklabels=le.classes_,
+        xticklabels=classes,
+        yticklabels=classes,
     )
-    plt.title(f"{tgt.title()} Confusion Matrix")
+    plt.title(title)
     plt.xlabel("Predicted")
     plt.ylabel("Actual")
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, f"cm_{tgt}.png"), dpi=300)
+    plt.savefig(path, dpi=DPI)
     plt.close()
-print("✔ Confusion matrices saved")
-
-# ---------------- 3. PRECISION / RECALL / F1 BAR CHART ----------------
-metrics_list = []
-for tgt in TARGETS:
-    le = label_encoders[tgt + "_label"]
-    model = models[tgt]
-    X = df[FEATURE_COLS]
-    y_true_encoded = le.transform(df[tgt + "_label"])
-    y_pred_encoded = model.predict(X)
-    report = classification_report(y_true_encoded, y_pred_encoded, output_dict=True)
-    metrics_list.append(pd.DataFrame(report).transpose().assign(Garment=tgt.title()))
-
-metrics_df = pd.concat(metrics_list)
-pivot = metrics_df.groupby("Garment")[["precision", "recall", "f1-score"]].mean()
-pivot.plot(kind="bar", figsize=(10, 5))
-plt.title("Average Precision / Recall / F1 per Garment Type")
-plt.ylabel("Score")
-plt.ylim(0, 1)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "prf1_bar.png"), dpi=300)
-plt.close()
-print("✔ PRF1 bar chart saved")
-
-# ---------------- 4. DISTRIBUTION FIGURES ----------------
-plt.figure(figsize=(7, 5))
-sns.countplot(x="weather_condition", data=df, palette="pastel")
-plt.title("Weather Condition Distribution")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "weather_condition_dist.png"), dpi=300)
-plt.close()
-
-plt.figure(figsize=(7, 5))
-sns.countplot(x="rain", data=df, palette="cool")
-plt.title("Rain Distribution")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "rain_dist.png"), dpi=300)
-plt.close()
-
-plt.figure(figsize=(7, 5))
-sns.countplot(x="gender", data=df, palette="Set2")
-plt.title("Gender Distribution")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "gender_dist.png"), dpi=300)
-plt.close()
-
-plt.figure(figsize=(10, 5))
-sns.countplot(
-    x="day_of_week",
-    data=df,
-    order=["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"],
-    palette="muted",
-)
-plt.title("Day of Week Distribution")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "day_of_week_dist.png"), dpi=300)
-plt.close()
-
-# ---------------- 5. MODEL LABEL DISTRIBUTION ----------------
-for tgt in TARGETS:
-    plt.figure(figsize=(10, 5))
-    sns.countplot(
-        x=f"{tgt}_label",
-        data=df,
-        order=df[f"{tgt}_label"].value_counts().index,
-        palette="Set3",
-    )
-    plt.title(f"{tgt.title()} Label Distribution")
-    plt.xticks(rotation=45)
+
+
+def render_prf1(path, pivot):
+    pivot.plot(kind="bar", figsize=(10, 5))
+    plt.title("Average Precision / Recall / F1 per Garment Type")
+    plt.ylabel("Score")
+    plt.ylim(0, 1)
     plt.tight_layout()
-    plt.savefig(os.path.join(OUTPUT_DIR, f"{tgt}_label_dist.png"), dpi=300)
+    plt.savefig(path, dpi=DPI)
     plt.close()
 
-# ---------------- 6. API LATENCY HISTOGRAM ----------------
-latencies = []
-for _ in range(50):
-    start = time.perf_counter()
-    try:
-        requests.get(API_TEST_URL)
-    except Exception as e:
-        print("⚠ API call failed:", e)
-    end = time.perf_counter()
-    latencies.append(end - start)
-
-lat_series = pd.Series(latencies, name="Seconds")
-lat_series.plot(kind="hist", bins=12, color="skyblue", edgecolor="black")
-plt.title("API Response Time (50 calls)")
-plt.xlabel("Seconds")
-plt.ylabel("Frequency")
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, "latency_hist.png"), dpi=300)
-plt.close()
-print("✔ API latency histogram saved")
-
-print(f"\nAll figures generated in: {OUTPUT_DIR}")
+
+def render_counts(path, column, title, palette, figsize, counts, rotate=False):
+    plt.figure(figsize=figsize)
+    x = counts.index.astype(str)
+    sns.barplot(x=x, y=counts.to_numpy(), hue=x, palette=palette, legend=False)
+    plt.title(title)
+    plt.xlabel(column)
+    plt.ylabel("count")
+    if rotate:
+        plt.xticks(rotation=45)
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+def render_latency(path, latencies):
+    lat_series = pd.Series(latencies, name="Seconds")
+    lat_series.plot(kind="hist", bins=12, color="skyblue", edgecolor="black")
+    plt.title(f"API Response Time ({len(latencies)} calls)")
+    plt.xlabel("Seconds")
+    plt.ylabel("Frequency")
+    plt.tight_layout()
+    plt.savefig(path, dpi=DPI)
+    plt.close()
+
+
+# ---------------- FIGURE INPUTS ----------------
+def figure_jobs(names, args):
+    """(figure name, render function, arguments after the output path) per figure."""
+    df = None
+    if any(n != "latency_hist" for n in names):
+        df = pd.read_csv(args.data)
+
+    jobs, preds = [], {}
+    if any(n in PREDICTION_FIGURES for n in names):
+        preds = predictions(df, args)
+    if "accuracy_bar" in names:
+        acc_df = pd.DataFrame(
+            [
+                {"Garment": t.title(), "Accuracy": accuracy_score(true, pred)}
+                for t, (true, pred, _) in preds.items()
+            ]
+        )
+        acc_df.to_csv(os.path.join(args.out, "accuracy_table.csv"), index=False)
+        print("✔ Accuracy table saved")
+        jobs.append(("accuracy_bar", render_accuracy, (acc_df,)))
+    for t, (true, pred, classes) in preds.items():
+        if f"cm_{t}" in names:
+            cm = confusion_matrix(true, pred)
+            title = f"{t.title()} Confusion Matrix"
+            jobs.append((f"cm_{t}", render_confusion, (title, cm, list(classes))))
+    if "prf1_bar" in names:
+        metrics = [
+            pd.DataFrame(classification_report(true, pred, output_dict=True))
+            .transpose()
+            .assign(Garment=t.title())
+            for t, (true, pred, _) in preds.items()
+        ]
+        pivot = (
+            pd.concat(metrics)
+            .groupby("Garment")[["precision", "recall", "f1-score"]]
+            .mean()
+        )
+        jobs.append(("prf1_bar", render_prf1, (pivot,)))
+
+    for name, (column, title, palette, figsize) in DISTRIBUTIONS.items():
+        if name in names:
+            order = DAYS if column == "day_of_week" else None
+            counts = category_counts(df[column], order)
+            jobs.append(
+                (name, render_counts, (column, title, palette, figsize, counts))
+            )
+    for t in TARGETS:
+        if f"{t}_label_dist" in names:
+            counts = df[f"{t}_label"].value_counts()
+            title = f"{t.title()} Label Distribution"
+            jobs.append(
+                (
+                    f"{t}_label_dist",
+                    render_counts,
+                    (f"{t}_label", title, "Set3", (10, 5), counts, True),
+                )
+            )
+
+    if "latency_hist" in names:
+        latencies = load_test_latency(args.load_results) or measure_latency(
+            args.api_url
+        )
+        jobs.append(("latency_hist", render_latency, (latencies,)))
+    return jobs
+
+
+def select(patterns):
+    """Figure names matching any of the --only patterns (all when none)."""
+    if not patterns:
+        return list(FIGURES)
+    names = [n for n in FIGURES if any(fnmatch.fnmatch(n, p) for p in patterns)]
+    if not names:
+        raise SystemExit(f"no figure matches {patterns}; see --list")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render the report figures")
+    parser.add_argument("--only", nargs="+", metavar="NAME", help="names or globs")
+    parser.add_argument("--list", action="store_true", help="list figure names")
+    parser.add_argument("--data", default=CSV_PATH)
+    parser.add_argument("--bundle", default=BUNDLE_DIR)
+    parser.add_argument("--models", default=MODEL_DIR, help="legacy pickles fallback")
+    parser.add_argument("--out", default=OUTPUT_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--api-url", default=API_TEST_URL)
+    parser.add_argument(
+        "--load-results",
+        default=LOAD_RESULTS,
+        help="load-test JSON for latency_hist (else --api-url is called)",
+    )
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.list:
+        print("\n".join(FIGURES))
+        return
+
+    started = time.perf_counter()
+    os.makedirs(args.out, exist_ok=True)
+    jobs = figure_jobs(select(args.only), args)
+
+    def path(name):
+        return os.path.join(args.out, f"{name}.png")
+
+    if args.workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(min(args.workers, len(jobs))) as pool:
+            futures = [
+                (name, pool.submit(fn, path(name), *fn_args))
+                for name, fn, fn_args in jobs
+            ]
+            for name, future in futures:
+                future.result()
+                print(f"✔ {name} saved")
+    else:
+        for name, fn, fn_args in jobs:
+            fn(path(name), *fn_args)
+            print(f"✔ {name} saved")
+
+    print(
+        f"\n{len(jobs)} figure(s) generated in {args.out} "
+        f"({time.perf_counter() - started:.1f} s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+"""SHA-256 of files, read in blocks (bundle manifests, dataset manifests, cache keys)."""
+
+import glob
+import hashlib
+import os
+
+
+def update_file(digest, path, block_size=1 << 20):
+    """Feed the bytes of `path` into the hashlib object `digest`; returns it."""
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest
+
+
+def sha256_file(path):
+    return update_file(hashlib.sha256(), path).hexdigest()
+
+
+def parquet_parts(path):
+    return sorted(glob.glob(os.path.join(path, "part-*.parquet")))
+
+
+def dataset_digest(path):
+    """SHA-256 of a CSV file, or of every part of a Parquet directory."""
+    h = hashlib.sha256()
+    for part in parquet_parts(path) if os.path.isdir(path) else [path]:
+        h.update(os.path.basename(part).encode())
+        update_file(h, part)
+    return h.hexdigest()
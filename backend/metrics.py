@@ -0,0 +1,200 @@
+"""
+Minimal Prometheus metrics (text exposition format 0.0.4) without a client
+library.
+
+Histograms and counters keep plain Python numbers per label-value tuple, so an
+observation is a dict lookup, a bisect and two additions (well under a
+microsecond; `python -m benchmarks.metrics_overhead`). Observations come from
+the event loop thread, so no locking is done (a model reload's canary check
+runs in a worker thread; an increment lost to it is tolerated). A disabled
+`Registry` hands out the same objects but `observe` / `inc` return immediately
+(`enabled` is fixed when the registry is created).
+
+Counts are per process: with several uvicorn workers each one serves its own
+numbers, and Prometheus sums them across scrape targets.
+"""
+
+import math
+import time
+from bisect import bisect_left
+
+# seconds; upstream calls and whole requests sit at the top, model stages at the bottom
+DEFAULT_BUCKETS = (
+    0.00005,
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, registry, name, help, labelnames=()):
+        self.enabled = registry.enabled
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        if self.enabled:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, registry, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.enabled = registry.enabled
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children = {}  # label values -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value, *labels):
+        if not self.enabled:
+            return
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        child[0][bisect_left(self.buckets, value)] += 1
+        child[1] += value
+
+    def since(self, started, *labels):
+        """Observe the time elapsed since `started` (a perf_counter reading)."""
+        if not self.enabled:
+            return
+        # observe() inlined: one call less on the request path
+        value = time.perf_counter() - started
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        child[0][bisect_left(self.buckets, value)] += 1
+        child[1] += value
+
+    def samples(self):
+        bounds = self.buckets + (math.inf,)
+        for labels, (counts, total) in sorted(self._children.items()):
+            cumulative = 0
+            for le, n in zip(bounds, counts):
+                cumulative += n
+                le_label = _labels(self.labelnames, labels, f'le="{_number(le)}"')
+                yield f"{self.name}_bucket{le_label} {cumulative}"
+            label_str = _labels(self.labelnames, labels)
+            yield f"{self.name}_sum{label_str} {_number(total)}"
+            yield f"{self.name}_count{label_str} {cumulative}"
+
+
+class Registry:
+    """
+    Named metrics plus collectors: callables run at scrape time that return
+    (name, kind, help, [(label dict, value)]) tuples, for numbers already
+    counted elsewhere (cache statistics, the loaded model version).
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, help, labelnames=()):
+        metric = Counter(self, name, help, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(self, name, help, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, fn):
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for fn in self._collectors:
+            for name, kind, help, samples in fn():
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(
+                        f"{name}{_labels(labels, labels.values())} {_number(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """
+    ASGI middleware observing each HTTP request's total time into `histogram`
+    (labels: route template, method, status). Requests that match no route are
+    labelled with an empty route.
+    """
+
+    def __init__(self, app, histogram):
+        self.app = app
+        self.histogram = histogram
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+        status = [500]
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            route = scope.get("route")
+            self.histogram.since(
+                started,
+                getattr(route, "path", ""),
+                scope["method"],
+                str(status[0]),
+            )
@@ -0,0 +1,194 @@
+"""
+Versioned model bundle: everything serving needs, in one directory.
+
+    manifest.json           format, version, feature schema, labels, file hashes
+                            and the class codes expected on the canary rows
+    tables.npz              category / numeric column / class tables as arrays
+    tree_ensemble.npz       NumPy node tables for all labels (tree_ensemble.py)
+    boosters/<label>.ubj    each booster in XGBoost's native binary format
+
+The schema's "encoding" says which encoder the models expect: "onehot"
+(FeatureEncoder) or "categorical" (CategoryEncoder, for boosters trained with
+native categorical splits).
+
+Loading with the "numpy" backend needs only NumPy (no pickle, sklearn, xgboost
+or pandas); the "xgboost" backend loads the .ubj boosters instead.
+
+    cd backend && python model_bundle.py            # legacy pickles -> bundle
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+
+import numpy as np
+
+from hashing import sha256_file
+from predictor import (
+    CANARY_ROWS,
+    CAT_FEATURES,
+    ENCODERS,
+    FEATURES,
+    MultiHeadPredictor,
+)
+
+BUNDLE_FORMAT = 1
+MANIFEST = "manifest.json"
+
+
+def bundle_digest(manifest):
+    """Content hash of a bundle: SHA-256 over its manifest's per-file hashes."""
+    return hashlib.sha256(
+        json.dumps(manifest["files"], sort_keys=True).encode()
+    ).hexdigest()
+
+
+def write_bundle(predictor, out_dir, version=None):
+    """
+    Write `predictor` (a MultiHeadPredictor with boosters) as a bundle. Files
+    go to a temporary sibling directory first, which then replaces `out_dir`,
+    so readers never see a half-written bundle.
+    """
+    ensemble = predictor.ensemble or predictor.export_ensemble()
+    labels = list(predictor.classes)
+    encoder = predictor.encoder
+    canary = predictor.predict_codes(predictor.encode(CANARY_ROWS), backend="xgboost")
+
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".bundle-", dir=parent)
+    os.chmod(tmp, 0o755)
+    try:
+        os.makedirs(os.path.join(tmp, "boosters"))
+        for lbl, booster in predictor.boosters.items():
+            booster.save_model(os.path.join(tmp, "boosters", f"{lbl}.ubj"))
+        tables = {
+            f"categories__{f}": np.asarray(encoder.categories[f]) for f in CAT_FEATURES
+        }
+        tables["numeric"] = np.asarray(encoder.numeric)
+        for lbl in labels:
+            tables[f"classes__{lbl}"] = np.asarray(predictor.classes[lbl], dtype=str)
+        np.savez(os.path.join(tmp, "tables.npz"), **tables)
+        ensemble.save(os.path.join(tmp, "tree_ensemble.npz"))
+
+        files = {}
+        for root, _, names in os.walk(tmp):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, tmp).replace(os.sep, "/")] = sha256_file(
+                    path
+                )
+        content = hashlib.sha256(json.dumps(files, sort_keys=True).encode())
+        created = datetime.now(timezone.utc)
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": version or f"{created:%Y%m%d%H%M%S}-{content.hexdigest()[:8]}",
+            "created": created.isoformat(timespec="seconds"),
+            "labels": labels,
+            "feature_schema": {
+                "features": FEATURES,
+                "encoding": encoder.encoding,
+                "categorical": {f: encoder.categories[f] for f in CAT_FEATURES},
+                "numeric": encoder.numeric,
+                "columns": encoder.feature_names,
+            },
+            "canary": {lbl: canary[lbl].tolist() for lbl in labels},
+            "files": files,
+        }
+        with open(os.path.join(tmp, MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+
+        if os.path.exists(out_dir):
+            shutil.rmtree(out_dir)
+        os.replace(tmp, out_dir)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+    return manifest
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as f:
+        return json.load(f)
+
+
+def load_bundle(path, backend="numpy", verify=True):
+    """
+    Load a bundle as a MultiHeadPredictor. `backend` "numpy" attaches the tree
+    ensemble; "xgboost" loads the native boosters. With `verify`, every file's
+    content hash is checked against the manifest first, and the loaded models
+    must reproduce the manifest's canary predictions.
+    """
+    manifest = read_manifest(path)
+    if manifest.get("format") != BUNDLE_FORMAT:
+        raise ValueError(f"unsupported bundle format {manifest.get('format')}")
+    if verify:
+        for name, digest in manifest["files"].items():
+            if sha256_file(os.path.join(path, name)) != digest:
+                raise ValueError(f"bundle file {name} does not match its manifest hash")
+
+    schema = manifest["feature_schema"]
+    if schema.get("encoding") not in ENCODERS:
+        raise ValueError(f"unsupported feature encoding {schema.get('encoding')}")
+    with np.load(os.path.join(path, "tables.npz")) as tables:
+        encoder = ENCODERS[schema["encoding"]](
+            {f: tables[f"categories__{f}"].tolist() for f in CAT_FEATURES},
+            numeric=tables["numeric"].tolist(),
+        )
+        classes = {
+            lbl: tables[f"classes__{lbl}"].tolist() for lbl in manifest["labels"]
+        }
+    if encoder.feature_names != schema["columns"]:
+        raise ValueError("bundle tables do not match its feature schema")
+
+    boosters, ensemble = {}, None
+    if backend == "xgboost":
+        import xgboost as xgb
+
+        for lbl in manifest["labels"]:
+            boosters[lbl] = xgb.Booster(
+                model_file=os.path.join(path, "boosters", f"{lbl}.ubj")
+            )
+    else:
+        from tree_ensemble import TreeEnsemble
+
+        ensemble = TreeEnsemble.load(os.path.join(path, "tree_ensemble.npz"))
+        if ensemble.labels != manifest["labels"]:
+            raise ValueError("bundle tree ensemble labels do not match its manifest")
+    predictor = MultiHeadPredictor(
+        encoder,
+        boosters,
+        classes,
+        ensemble=ensemble,
+        version=manifest["version"],
+        digest=bundle_digest(manifest),
+    )
+    if verify:
+        got = predictor.predict_codes(predictor.encode(CANARY_ROWS))
+        for lbl, codes in manifest["canary"].items():
+            if got[lbl].tolist() != codes:
+                raise ValueError(f"bundle {lbl} model fails its canary predictions")
+    return predictor
+
+
+def main():
+    from predictor import load_pipelines_predictor
+
+    parser = argparse.ArgumentParser(description="Build a model bundle from pickles")
+    parser.add_argument("--models", default="models", help="legacy pickle directory")
+    parser.add_argument("--out", default="models/bundle")
+    parser.add_argument("--version")
+    args = parser.parse_args()
+
+    predictor = load_pipelines_predictor(args.models)
+    predictor.use_ensemble(predictor.export_ensemble())
+    manifest = write_bundle(predictor, args.out, args.version)
+    print(f"Model bundle {manifest['version']} saved → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
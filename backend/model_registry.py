@@ -0,0 +1,123 @@
+"""
+Hot-swappable model generations.
+
+A `ModelSet` is everything one model version serves with: predictor, outfit
+source (the predictor or a lookup table in front of it) and its memo. The
+registry holds a single reference to the active set; requests take that
+reference once and use it to the end, so a reload never changes the models
+under an in-flight request. Reloads build and validate the new set completely
+before the reference is replaced.
+"""
+
+import threading
+import time
+
+from predictor import CANARY_ROWS
+
+OUTFIT_PARTS = ("top", "bottom", "footwear", "accessory")
+
+
+class ModelSet:
+    def __init__(self, predictor, source=None, memo=None):
+        self.predictor = predictor
+        self.source = source if source is not None else predictor
+        self.memo = memo
+        self.version = predictor.version or "unversioned"
+        self.loaded_at = time.time()
+
+    def predict_outfits(self, rows):
+        if self.memo is not None:
+            return self.memo.predict_outfits(rows)
+        return self.source.predict_outfits(rows)
+
+    def validate(self, rows=CANARY_ROWS):
+        """
+        Predict `rows` through the full serving path; raise on a bad outfit, or
+        if the outfit source (lookup table) disagrees with the models whose
+        version this set reports.
+        """
+        outfits = self.source.predict_outfits(list(rows))
+        if self.source is not self.predictor:
+            # the table is exact on its own grid points, so compare there
+            probe = self.source.probe_rows(rows)
+            if self.source.predict_outfits(probe) != self.predictor.predict_outfits(
+                probe
+            ):
+                raise ValueError(
+                    "outfit source disagrees with the models on its grid points"
+                )
+        if len(outfits) != len(rows):
+            raise ValueError("model set returned the wrong number of outfits")
+        for outfit in outfits:
+            if sorted(outfit) != sorted(OUTFIT_PARTS) or not all(
+                isinstance(v, str) and v for v in outfit.values()
+            ):
+                raise ValueError(f"model set returned a malformed outfit: {outfit}")
+        return outfits
+
+
+class ModelRegistry:
+    """
+    Owns the active ModelSet. `load(path)` builds a ModelSet (path None means
+    the configured default); it runs under a lock so at most one load is in
+    progress, while readers only ever read the current reference.
+    """
+
+    def __init__(self, load):
+        self._load = load
+        self._active = None
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def loaded(self):
+        return self._active is not None
+
+    def get(self):
+        """The active ModelSet, loading the default one on first use."""
+        models = self._active
+        if models is None:
+            with self._lock:
+                if self._active is None:
+                    models = self._load(None)
+                    models.validate()
+                    self._active = models
+            models = self._active
+        return models
+
+    def reload(self, path=None):
+        """
+        Load and validate a new ModelSet, then make it active. On failure the
+        current set stays active and the error is re-raised. Returns
+        (previous version, new version, canary rows whose outfit changed).
+        """
+        with self._lock:
+            try:
+                models = self._load(path)
+                outfits = models.validate()
+            except Exception as e:
+                self.failures += 1
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            previous = self._active
+            changed = (
+                sum(a != b for a, b in zip(previous.validate(), outfits))
+                if previous is not None
+                else len(outfits)
+            )
+            self._active = models
+            self.reloads += 1
+            self.last_error = None
+        return (previous.version if previous else None), models.version, changed
+
+    def stats(self):
+        models = self._active
+        return {
+            "version": models.version if models else None,
+            "loaded_at": round(models.loaded_at, 3) if models else None,
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
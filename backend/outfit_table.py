@@ -0,0 +1,280 @@
+"""
+Precomputed outfit lookup table.
+
+The model's input domain is small and bounded, so every label model is
+evaluated offline over a discretized grid of it (gender x weekday x season x
+condition x rain flag x temperature x humidity x wind, at the serving hour) and
+the class codes are written as one uint8 array. Serving memory-maps the array
+and turns a prediction into an index computation; rows outside the grid's
+categories or hour fall back to live inference.
+
+    cd backend && python outfit_table.py          # build models/outfit_table.*
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from predictor import CAT_FEATURES
+
+# numeric axes: (start, stop, step), stop inclusive; synthetic_30k.py draws
+# temperature in [-10, 45), humidity in [20, 100), wind in [0, 15). The default
+# grid is 1.4M input points (5.6 MB); every point costs a full ensemble pass at
+# build time, so finer steps trade build time for lower disagreement.
+DEFAULT_GRID = {
+    "temperature": (-10.0, 45.0, 1.0),
+    "humidity": (20.0, 100.0, 20.0),
+    "wind_speed": (0.0, 15.0, 3.0),
+}
+NUMERIC_AXES = ["temperature", "humidity", "wind_speed"]
+
+
+def _axis_points(start, stop, step):
+    return start + step * np.arange(int(round((stop - start) / step)) + 1)
+
+
+class OutfitTable:
+    """
+    Memory-mappable uint8 codes, shape (*category axes, rain, *numeric axes,
+    labels). Numeric inputs snap to the nearest grid point (clamped to the grid
+    range); unknown categories or another hour go to `fallback`.
+    """
+
+    def __init__(self, codes, meta, fallback=None):
+        self.codes = codes
+        self.meta = meta
+        self.labels = list(meta["labels"])
+        self.classes = {
+            lbl: np.asarray(meta["classes"][lbl], dtype=object) for lbl in self.labels
+        }
+        self.hour = meta["hour"]
+        self.grid = {f: tuple(meta["grid"][f]) for f in NUMERIC_AXES}
+        self._category_index = {
+            f: {c: i for i, c in enumerate(meta["categories"][f])} for f in CAT_FEATURES
+        }
+        self.fallback = fallback
+
+    @classmethod
+    def load(cls, path, fallback=None):
+        """Open `<path>.npy` memory-mapped with its `<path>.json` metadata."""
+        with open(path + ".json") as f:
+            meta = json.load(f)
+        codes = np.load(path + ".npy", mmap_mode="r")
+        return cls(codes, meta, fallback)
+
+    def mismatch(self, predictor):
+        """
+        Why this table cannot serve `predictor` (built from other models, or for
+        another encoding, categories or classes), or None if it can.
+        """
+        meta = self.meta
+        if meta.get("model_digest") is None:
+            return "table records no model digest (built by an older version)"
+        if meta["model_digest"] != predictor.digest:
+            return (
+                f"built from model {meta.get('model_version')}, "
+                f"serving {predictor.version}"
+            )
+        if meta.get("encoding") != predictor.encoder.encoding:
+            return f"built for {meta.get('encoding')} encoding"
+        if meta["categories"] != {
+            f: list(predictor.encoder.categories[f]) for f in CAT_FEATURES
+        }:
+            return "built for other feature categories"
+        if meta["classes"] != {
+            lbl: [str(c) for c in classes] for lbl, classes in predictor.classes.items()
+        }:
+            return "built for other model classes"
+        return None
+
+    def probe_rows(self, rows, n=256, seed=0):
+        """
+        Inputs the table answers exactly (it was built on them): `rows` moved
+        onto the grid (numeric inputs to the nearest point, hour to the table's
+        hour) plus `n` random grid points.
+        """
+        rng = np.random.default_rng(seed)
+        categories = self.meta["categories"]
+        rows = list(rows) + [
+            {
+                **{f: c[rng.integers(len(c))] for f, c in categories.items()},
+                **{f: float(rng.uniform(*self.grid[f][:2])) for f in NUMERIC_AXES},
+                "rain": int(rng.integers(2)),
+            }
+            for _ in range(n)
+        ]
+        probe = []
+        for row in rows:
+            row = dict(row, hour=self.hour)
+            for f in NUMERIC_AXES:
+                start, stop, step = self.grid[f]
+                last = int(round((stop - start) / step))
+                i = min(max(math.floor((row[f] - start) / step + 0.5), 0), last)
+                row[f] = float(start + step * i)
+            probe.append(row)
+        return probe
+
+    def index(self, row):
+        """Grid index tuple for a raw input row, or None if it is off-grid."""
+        if row["hour"] != self.hour:
+            return None
+        idx = []
+        for f in CAT_FEATURES:
+            i = self._category_index[f].get(row[f])
+            if i is None:
+                return None
+            idx.append(i)
+        idx.append(1 if row["rain"] else 0)
+        for f in NUMERIC_AXES:
+            start, stop, step = self.grid[f]
+            last = int(round((stop - start) / step))
+            i = math.floor((row[f] - start) / step + 0.5)
+            idx.append(min(max(i, 0), last))
+        return tuple(idx)
+
+    def predict_outfits(self, rows):
+        outfits = [None] * len(rows)
+        off_grid = []
+        for i, row in enumerate(rows):
+            idx = self.index(row)
+            if idx is None:
+                off_grid.append(i)
+                continue
+            codes = self.codes[idx]
+            outfits[i] = {
+                lbl.replace("_label", ""): self.classes[lbl][codes[j]]
+                for j, lbl in enumerate(self.labels)
+            }
+        if off_grid:
+            if self.fallback is None:
+                raise ValueError("input outside the outfit table and no fallback")
+            for i, outfit in zip(
+                off_grid, self.fallback.predict_outfits([rows[i] for i in off_grid])
+            ):
+                outfits[i] = outfit
+        return outfits
+
+
+def build_table(predictor, path, grid=DEFAULT_GRID, hour=12, check_rows=20000):
+    """
+    Evaluate `predictor` (a MultiHeadPredictor) over the grid and write
+    `<path>.npy` / `<path>.json`. Reports per-label disagreement with live
+    inference on random in-domain inputs.
+    """
+    encoder = predictor.encoder
+    categories = {f: list(encoder.categories[f]) for f in CAT_FEATURES}
+    points = {f: _axis_points(*grid[f]) for f in NUMERIC_AXES}
+    labels = list(predictor.classes)
+    cat_shape = [len(categories[f]) for f in CAT_FEATURES] + [2]
+    num_shape = [len(points[f]) for f in NUMERIC_AXES]
+
+    # one block per categorical combination: every numeric grid point
+    mesh = np.meshgrid(*(points[f] for f in NUMERIC_AXES), indexing="ij")
+    block_cols = {f: m.ravel() for f, m in zip(NUMERIC_AXES, mesh)}
+    block_rows = block_cols["temperature"].size
+
+    codes = np.lib.format.open_memmap(
+        path + ".npy",
+        mode="w+",
+        dtype=np.uint8,
+        shape=tuple(cat_shape + num_shape + [len(labels)]),
+    )
+    started = time.perf_counter()
+    for cat_idx in itertools.product(*(range(n) for n in cat_shape)):
+        cols = dict(block_cols)
+        for f, i in zip(CAT_FEATURES, cat_idx):
+            cols[f] = np.full(block_rows, categories[f][i], dtype=object)
+        cols["rain"] = np.full(block_rows, cat_idx[-1], dtype=np.float32)
+        cols["hour"] = np.full(block_rows, hour, dtype=np.float32)
+        X = encoder.encode_columns(cols)
+        block = predictor.predict_codes(X, backend="xgboost")
+        codes[cat_idx] = np.stack([block[lbl] for lbl in labels], axis=-1).reshape(
+            num_shape + [len(labels)]
+        )
+    codes.flush()
+    build_seconds = time.perf_counter() - started
+
+    meta = {
+        "model_version": predictor.version,
+        "model_digest": predictor.digest,
+        "encoding": encoder.encoding,
+        "labels": labels,
+        "classes": {lbl: [str(c) for c in predictor.classes[lbl]] for lbl in labels},
+        "categories": categories,
+        "hour": hour,
+        "grid": {f: list(grid[f]) for f in NUMERIC_AXES},
+        "shape": list(codes.shape),
+        "build_seconds": round(build_seconds, 1),
+    }
+    table = OutfitTable(codes, meta)
+    meta["disagreement"] = measure_disagreement(table, predictor, check_rows)
+    meta["max_disagreement"] = max(meta["disagreement"].values())
+    with open(path + ".json", "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def measure_disagreement(table, predictor, n_rows, seed=0):
+    """Fraction of random in-domain inputs where table and live inference differ."""
+    rng = np.random.default_rng(seed)
+    rows = []
+    for _ in range(n_rows):
+        row = {f: float(rng.uniform(*table.grid[f][:2])) for f in NUMERIC_AXES}
+        row.update(
+            {
+                f: table.meta["categories"][f][rng.integers(len(c))]
+                for f, c in table.meta["categories"].items()
+            }
+        )
+        row["rain"] = int(rng.integers(2))
+        row["hour"] = table.hour
+        rows.append(row)
+    live = predictor.predict_codes(predictor.encode(rows), backend="xgboost")
+    idx = [table.index(r) for r in rows]
+    return {
+        lbl: float(
+            np.mean([table.codes[i][j] != live[lbl][k] for k, i in enumerate(idx)])
+        )
+        for j, lbl in enumerate(table.labels)
+    }
+
+
+def main():
+    from model_bundle import MANIFEST, load_bundle
+    from predictor import load_pipelines_predictor
+
+    parser = argparse.ArgumentParser(description="Build the outfit lookup table")
+    parser.add_argument("--bundle", default="models/bundle")
+    parser.add_argument("--models", default="models", help="legacy pickles fallback")
+    parser.add_argument("--out", default="models/outfit_table")
+    for f, (start, stop, step) in DEFAULT_GRID.items():
+        parser.add_argument(f"--{f.replace('_', '-')}-step", type=float, default=step)
+    args = parser.parse_args()
+
+    if os.path.exists(os.path.join(args.bundle, MANIFEST)):
+        predictor = load_bundle(args.bundle, backend="xgboost")
+    else:
+        predictor = load_pipelines_predictor(args.models)
+
+    grid = {
+        f: (start, stop, getattr(args, f"{f}_step"))
+        for f, (start, stop, _) in DEFAULT_GRID.items()
+    }
+    meta = build_table(predictor, args.out, grid)
+    size_mb = os.path.getsize(args.out + ".npy") / 1e6
+    print(
+        f"Outfit table saved → {args.out}.npy  shape {meta['shape']}  {size_mb:.1f} MB"
+    )
+    print(f"Built in {meta['build_seconds']} s")
+    for lbl, rate in meta["disagreement"].items():
+        print(f"  {lbl:<16} disagreement vs live inference {rate:.2%}")
+    print(f"Max disagreement: {meta['max_disagreement']:.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+import math
+import time
+
+import numpy as np
+
+from weather_cache import TTLCache
+
+LABELS = ["top_label", "bottom_label", "footwear_label", "accessory_label"]
+
+# Raw model inputs, in the order train.py selects them
+FEATURES = [
+    "temperature",
+    "humidity",
+    "wind_speed",
+    "rain",
+    "gender",
+    "hour",
+    "day_of_week",
+    "season",
+    "weather_condition",
+]
+CAT_FEATURES = ["gender", "day_of_week", "season", "weather_condition"]
+NUM_FEATURES = ["temperature", "humidity", "wind_speed", "rain", "hour"]
+
+# Inputs covering every known category plus an unseen one; used to check an
+# encoder / model set before it serves traffic
+CANARY_ROWS = [
+    {
+        "temperature": t,
+        "humidity": h,
+        "wind_speed": w,
+        "rain": r,
+        "gender": g,
+        "hour": 12,
+        "day_of_week": d,
+        "season": s,
+        "weather_condition": c,
+    }
+    for t, h, w, r, g, d, s, c in [
+        (-8.5, 90, 12.0, 0, "male", "Mon", "Winter", "Snow"),
+        (3.2, 81, 4.2, 1, "female", "Tue", "Winter", "Rain"),
+        (9.9, 60, 7.5, 0, "baby", "Wed", "Autumn", "Clouds"),
+        (14.0, 45, 2.0, 1, "male", "Thu", "Spring", "Thunderstorm"),
+        (19.5, 30, 0.0, 0, "female", "Fri", "Spring", "Clear"),
+        (24.8, 55, 3.3, 0, "baby", "Sat", "Summer", "Clear"),
+        (29.0, 70, 1.1, 1, "male", "Sun", "Summer", "Rain"),
+        (41.0, 20, 5.0, 0, "female", "Sun", "Autumn", "Haze"),
+    ]
+]
+
+
+def _onehot_categories(preprocessor):
+    return [list(c) for c in preprocessor.named_transformers_["cat"].categories_]
+
+
+class FeatureEncoder:
+    """
+    Pandas-free replacement for the fitted ColumnTransformer: maps raw model
+    inputs straight into a float32 matrix laid out exactly like the
+    preprocessor's output (one-hot blocks in fitted category order, then the
+    passthrough numeric columns). Unknown categories encode as all zeros, like
+    OneHotEncoder(handle_unknown="ignore").
+    """
+
+    encoding = "onehot"
+    feature_types = None  # all columns numeric to XGBoost
+
+    def __init__(self, categories, numeric=NUM_FEATURES):
+        self.categories = {f: list(categories[f]) for f in CAT_FEATURES}
+        self.numeric = list(numeric)
+        self._onehot = []  # (feature, {category: column})
+        self._offsets = {}  # feature -> first column of its one-hot block
+        col = 0
+        for f in CAT_FEATURES:
+            self._onehot.append(
+                (f, {c: col + i for i, c in enumerate(self.categories[f])})
+            )
+            self._offsets[f] = col
+            col += len(self.categories[f])
+        self._numeric_cols = [(f, col + i) for i, f in enumerate(self.numeric)]
+        self.n_features = col + len(self.numeric)
+        self.feature_names = [
+            f"{f}_{c}" for f in CAT_FEATURES for c in self.categories[f]
+        ] + self.numeric
+
+    @classmethod
+    def from_preprocessor(cls, preprocessor):
+        """Read category order and passthrough columns off a fitted ColumnTransformer."""
+        cat_name, _, cat_cols = preprocessor.transformers_[0]
+        if cat_name != "cat" or list(cat_cols) != CAT_FEATURES:
+            raise ValueError(f"unexpected categorical columns: {cat_cols}")
+        names_in = list(preprocessor.feature_names_in_)
+        numeric = [
+            names_in[i] if isinstance(i, (int, np.integer)) else i
+            for i in preprocessor.transformers_[1][2]
+        ]
+        if sorted(numeric) != sorted(NUM_FEATURES):
+            raise ValueError(f"unexpected passthrough columns: {numeric}")
+        return cls(dict(zip(CAT_FEATURES, _onehot_categories(preprocessor))), numeric)
+
+    def encode(self, rows, out=None):
+        """
+        Encode a sequence of row mappings (FEATURES keys) into an
+        (n_rows, n_features) float32 matrix, filling `out` when given.
+        """
+        n = len(rows)
+        if out is None:
+            out = np.zeros((n, self.n_features), dtype=np.float32)
+        else:
+            out[:n] = 0.0
+        for i, row in enumerate(rows):
+            for f, columns in self._onehot:
+                col = columns.get(row[f])
+                if col is not None:
+                    out[i, col] = 1.0
+            for f, col in self._numeric_cols:
+                out[i, col] = row[f]
+        return out
+
+    def encode_columns(self, columns):
+        """
+        Vectorised `encode` for column arrays ({feature: array}), for building
+        large matrices (grids, training data) without a per-row loop.
+        """
+        n = len(columns[FEATURES[0]])
+        out = np.zeros((n, self.n_features), dtype=np.float32)
+        for f, mapping in self._onehot:
+            values = np.asarray(columns[f])
+            for category, col in mapping.items():
+                out[values == category, col] = 1.0
+        for f, col in self._numeric_cols:
+            out[:, col] = columns[f]
+        return out
+
+    def encode_codes(self, columns):
+        """
+        `encode_columns` with the categorical features given as integer codes
+        into `self.categories` (-1 for unknown), so no strings are compared.
+        """
+        n = len(columns[FEATURES[0]])
+        out = np.zeros((n, self.n_features), dtype=np.float32)
+        rows = np.arange(n)
+        for f, offset in self._offsets.items():
+            codes = np.asarray(columns[f])
+            known = codes >= 0
+            out[rows[known], offset + codes[known]] = 1.0
+        for f, col in self._numeric_cols:
+            out[:, col] = columns[f]
+        return out
+
+    def check_against(self, preprocessor, rows=CANARY_ROWS):
+        """Raise if encoding `rows` differs from the fitted preprocessor's output."""
+        import pandas as pd
+
+        expected = preprocessor.transform(pd.DataFrame(list(rows), columns=FEATURES))
+        if hasattr(expected, "toarray"):
+            expected = expected.toarray()
+        got = self.encode(rows)
+        if got.shape != expected.shape or not np.array_equal(
+            got, np.asarray(expected, dtype=np.float32)
+        ):
+            raise ValueError("FeatureEncoder output differs from the preprocessor")
+
+
+class CategoryEncoder:
+    """
+    Encoder for boosters trained with XGBoost's native categorical support: one
+    column per categorical feature holding the value's index in a fixed
+    vocabulary, then the numeric columns. Unknown categories encode as NaN, so
+    they take each split's missing-value branch. Same interface as
+    FeatureEncoder.
+    """
+
+    encoding = "categorical"
+
+    def __init__(self, categories, numeric=NUM_FEATURES):
+        self.categories = {f: list(categories[f]) for f in CAT_FEATURES}
+        self.numeric = list(numeric)
+        self._codes = [
+            (f, {c: i for i, c in enumerate(self.categories[f])}) for f in CAT_FEATURES
+        ]
+        self._numeric_cols = [(f, len(CAT_FEATURES) + i) for i, f in enumerate(numeric)]
+        self.n_features = len(CAT_FEATURES) + len(self.numeric)
+        self.feature_names = CAT_FEATURES + self.numeric
+        self.feature_types = ["c"] * len(CAT_FEATURES) + ["q"] * len(self.numeric)
+
+    def encode(self, rows, out=None):
+        n = len(rows)
+        if out is None:
+            out = np.empty((n, self.n_features), dtype=np.float32)
+        for i, row in enumerate(rows):
+            for col, (f, codes) in enumerate(self._codes):
+                out[i, col] = codes.get(row[f], np.nan)
+            for f, col in self._numeric_cols:
+                out[i, col] = row[f]
+        return out
+
+    def encode_columns(self, columns):
+        n = len(columns[FEATURES[0]])
+        out = np.full((n, self.n_features), np.nan, dtype=np.float32)
+        for col, (f, codes) in enumerate(self._codes):
+            values = np.asarray(columns[f])
+            for category, code in codes.items():
+                out[values == category, col] = code
+        for f, col in self._numeric_cols:
+            out[:, col] = columns[f]
+        return out
+
+    def encode_codes(self, columns):
+        n = len(columns[FEATURES[0]])
+        out = np.empty((n, self.n_features), dtype=np.float32)
+        for col, (f, _) in enumerate(self._codes):
+            codes = np.asarray(columns[f])
+            out[:, col] = np.where(codes >= 0, codes, np.nan)
+        for f, col in self._numeric_cols:
+            out[:, col] = columns[f]
+        return out
+
+
+ENCODERS = {cls.encoding: cls for cls in (FeatureEncoder, CategoryEncoder)}
+
+
+class MultiHeadPredictor:
+    """
+    The four label models behind a single feature encoder.
+
+    Each saved pipeline carries its own copy of the same ColumnTransformer, so
+    predicting through the pipelines one-hot encodes every row four times. Here
+    rows are encoded once and the encoded matrix is fed to every label's model
+    (XGBoost boosters, or the NumPy tree ensemble when attached); class indices
+    are decoded with plain index -> label arrays.
+    """
+
+    def __init__(
+        self, encoder, boosters, classes, ensemble=None, version=None, digest=None
+    ):
+        self.encoder = encoder
+        self.boosters = dict(boosters or {})
+        self.classes = {
+            lbl: np.asarray(c, dtype=object) for lbl, c in dict(classes).items()
+        }
+        self.ensemble = ensemble
+        self.version = version
+        # content hash of the model files, to tie derived artifacts (the outfit
+        # lookup table) to the exact models they were built from
+        self.digest = digest
+        # optional callback(stage, label, seconds) for "encode" / "predict"
+        # timings; the tree ensemble scores all labels at once (label "all")
+        self.on_timing = None
+
+    def export_ensemble(self):
+        """Flatten the XGBoost boosters into a NumPy TreeEnsemble."""
+        from tree_ensemble import TreeEnsemble
+
+        return TreeEnsemble.from_boosters(self.boosters, self.encoder.n_features)
+
+    def use_ensemble(self, ensemble):
+        """
+        Score with `ensemble` instead of the XGBoost boosters, after checking
+        it reproduces their predictions on the canary rows.
+        """
+        X = self.encode(CANARY_ROWS)
+        expected = self.predict_codes(X, backend="xgboost")
+        got = ensemble.predict_codes(X)
+        for lbl, codes in expected.items():
+            if not np.array_equal(codes, got[lbl]):
+                raise ValueError(f"tree ensemble disagrees with {lbl} booster")
+        self.ensemble = ensemble
+
+    @classmethod
+    def from_pipelines(cls, pipelines, label_encoders):
+        """Build from the per-label sklearn Pipelines and their LabelEncoders."""
+        preprocessor = None
+        for lbl, pipe in pipelines.items():
+            pre = pipe.named_steps["preprocessor"]
+            if preprocessor is None:
+                preprocessor = pre
+            elif _onehot_categories(pre) != _onehot_categories(preprocessor):
+                raise ValueError(f"{lbl} pipeline was fitted on other categories")
+        return cls(
+            FeatureEncoder.from_preprocessor(preprocessor),
+            {
+                lbl: pipe.named_steps["classifier"].get_booster()
+                for lbl, pipe in pipelines.items()
+            },
+            {lbl: label_encoders[lbl].classes_ for lbl in pipelines},
+        )
+
+    def encode(self, rows):
+        return self.encoder.encode(rows)
+
+    def predict_codes(self, X_encoded, backend=None):
+        """
+        Class index per row for every label, from an already-encoded matrix.
+        Uses the NumPy tree ensemble when one is attached, unless
+        backend="xgboost".
+        """
+        if X_encoded.shape[0] == 0:
+            return {lbl: np.empty(0, dtype=np.int64) for lbl in self.classes}
+        timing = self.on_timing
+        if self.ensemble is not None and backend != "xgboost":
+            if timing is None:
+                return self.ensemble.predict_codes(X_encoded)
+            started = time.perf_counter()
+            codes = self.ensemble.predict_codes(X_encoded)
+            timing("predict", "all", time.perf_counter() - started)
+            return codes
+        if not self.boosters:
+            raise ValueError("no XGBoost boosters loaded for this model set")
+        # multi:softprob boosters return (rows, classes) probabilities
+        codes = {}
+        for lbl, booster in self.boosters.items():
+            started = time.perf_counter()
+            codes[lbl] = np.asarray(booster.inplace_predict(X_encoded)).argmax(axis=1)
+            if timing is not None:
+                timing("predict", lbl, time.perf_counter() - started)
+        return codes
+
+    def decode(self, codes):
+        """Class indices -> {"top", "bottom", "footwear", "accessory"} dict per row."""
+        labels = {
+            lbl.replace("_label", ""): self.classes[lbl][c] for lbl, c in codes.items()
+        }
+        n = len(next(iter(labels.values()))) if labels else 0
+        return [{part: values[i] for part, values in labels.items()} for i in range(n)]
+
+    def predict_encoded(self, X_encoded):
+        return self.decode(self.predict_codes(X_encoded))
+
+    def predict_outfits(self, rows):
+        """One outfit dict per raw input row (mapping with FEATURES keys)."""
+        if self.on_timing is None:
+            return self.predict_encoded(self.encode(rows))
+        started = time.perf_counter()
+        X = self.encode(rows)
+        self.on_timing("encode", "", time.perf_counter() - started)
+        return self.predict_encoded(X)
+
+
+def load_pipelines_predictor(model_dir="models"):
+    """MultiHeadPredictor from the legacy per-label pipeline pickles."""
+    import hashlib
+    import os
+    import pickle
+
+    digest = hashlib.sha256()
+
+    def load(name):
+        with open(os.path.join(model_dir, name), "rb") as f:
+            data = f.read()
+        digest.update(data)
+        return pickle.loads(data)
+
+    pipelines = {lbl: load(f"{lbl}_model.pkl") for lbl in LABELS}
+    label_encoders = load("global_label_encoders.pkl")
+    predictor = MultiHeadPredictor.from_pipelines(pipelines, label_encoders)
+    predictor.digest = digest.hexdigest()
+    return predictor
+
+
+class OutfitMemo:
+    """
+    Bounded LRU memo in front of a batch predictor. Numeric inputs are snapped
+    to a grid (`steps`, e.g. 0.5 °C / 1 % humidity / 0.5 m/s wind) and the
+    snapped row, together with the categorical fields, is both the cache key
+    and what gets predicted, so a key always maps to the same outfit.
+    """
+
+    DEFAULT_STEPS = {"temperature": 0.5, "humidity": 1.0, "wind_speed": 0.5}
+
+    def __init__(self, predict_outfits, maxsize=4096, steps=None):
+        self.predict = predict_outfits
+        self.steps = dict(self.DEFAULT_STEPS if steps is None else steps)
+        self.cache = TTLCache(maxsize=maxsize, ttl=math.inf)
+
+    def quantize(self, row):
+        snapped = dict(row)
+        for f, step in self.steps.items():
+            if step > 0:
+                snapped[f] = math.floor(row[f] / step + 0.5) * step
+        return tuple(snapped[f] for f in FEATURES), snapped
+
+    def predict_outfits(self, rows):
+        results = [None] * len(rows)
+        missing = []
+        for i, row in enumerate(rows):
+            key, snapped = self.quantize(row)
+            outfit = self.cache.get(key)
+            if outfit is None:
+                missing.append((i, key, snapped))
+            else:
+                results[i] = outfit
+        if missing:
+            outfits = self.predict([snapped for _, _, snapped in missing])
+            for (i, key, _), outfit in zip(missing, outfits):
+                self.cache.set(key, outfit)
+                results[i] = outfit
+        return [dict(outfit) for outfit in results]
+
+    def clear(self):
+        self.cache.clear()
+
+    def stats(self):
+        stats = self.cache.stats()
+        del stats["ttl"], stats["expirations"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["steps"] = self.steps
+        return stats
@@ -1,31 +1,44 @@
-import pandas as pd
-import numpy as np
-import random
+"""
+Synthetic outfit dataset.
 
-# SEED FOR REPRODUCIBILITY
-np.random.seed(42)
-random.seed(42)
+Labels depend only on (temperature, gender, weather condition), and the drawn
+temperatures are whole degrees, so every combination is labelled once with
+the rule functions below and rows pick their labels from that table by array
+indexing.
 
-# SETTINGS
-N = 30000
+    cd backend && python synthetic_30k.py --rows 30000 --seed 42
+    cd backend && python synthetic_30k.py --format parquet --rows 100000000 --workers 8
+"""
 
-# WEATHER FEATURES
-temperatures = np.random.randint(-10, 45, N)
-humidity = np.random.randint(20, 100, N)
-wind_speed = np.random.uniform(0, 15, N)
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-weather_condition = np.random.choice(
-    ["Clear", "Clouds", "Rain", "Snow", "Thunderstorm"],
-    N,
-    p=[0.45, 0.30, 0.15, 0.05, 0.05],
-)
+import numpy as np
+import pandas as pd
 
-rain = np.array([1 if w in ["Rain", "Thunderstorm"] else 0 for w in weather_condition])
+from hashing import sha256_file
 
-gender = np.random.choice(["male", "female", "baby"], N)
-hour = np.random.randint(6, 22, N)
-day_of_week = np.random.choice(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], N)
-season = np.random.choice(["Spring", "Summer", "Autumn", "Winter"], N)
+# SETTINGS
+N = 30000
+SEED = 42
+
+# FEATURE DOMAINS (temperature / humidity upper bounds exclusive)
+TEMP_RANGE = (-10, 45)
+HUMIDITY_RANGE = (20, 100)
+WIND_RANGE = (0, 15)
+CONDITIONS = ["Clear", "Clouds", "Rain", "Snow", "Thunderstorm"]
+CONDITION_P = [0.45, 0.30, 0.15, 0.05, 0.05]
+GENDERS = ["male", "female", "baby"]
+HOURS = (6, 22)
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+SEASONS = ["Spring", "Summer", "Autumn", "Winter"]
+RAIN_CODES = [CONDITIONS.index("Rain"), CONDITIONS.index("Thunderstorm")]
+LABELS = ["top_label", "bottom_label", "footwear_label", "accessory_label"]
+MANIFEST = "manifest.json"
 
 # TEMP MAPPING (UNCHANGED)
 TEMP_MAPPING = [
@@ -339,7 +352,9 @@ TEMP_MAPPING = [
 
 # FUNCTION TO PICK OUTFIT
 def get_categories(temp, weather, gender):
-    # Picks outfit categories based on temperature, gender, and weather overrides. Returns a list of categories.
+    # Picks outfit categories based on temperature, gender, and weather overrides.
+    # Returns a list of categories, de-duplicated in rule order so the selectors'
+    # "first match" is the same on every run (a set's order depends on the hash seed).
     outfit = []
 
     weather_lower = weather.lower() if isinstance(weather, str) else ""
@@ -356,7 +371,7 @@ def get_categories(temp, weather, gender):
             if weather_lower == rule["weather_condition"].lower():
                 outfit.extend(rule["categories"])
 
-    return list(set(outfit))
+    return list(dict.fromkeys(outfit))
 
 
 # LABEL SELECTORS
@@ -460,39 +475,226 @@ def select_accessory(categories, weather=None):
     return "none"
 
 
-# BUILD DATAFRAME
-data = pd.DataFrame(
-    {
-        "temperature": temperatures,
-        "humidity": humidity,
-        "wind_speed": wind_speed,
-        "weather_condition": weather_condition,
-        "rain": rain,
-        "gender": gender,
-        "hour": hour,
-        "day_of_week": day_of_week,
-        "season": season,
+# LABEL TABLE
+def build_label_table():
+    """
+    Labels for every (temperature, gender, condition) in the feature domain.
+    Returns ({label: vocabulary array}, {label: code array}, categories) where
+    the code arrays and `categories` (outfit category lists) are indexed by
+    `table_index`.
+    """
+    rows = []
+    for temp in range(*TEMP_RANGE):
+        for gender in GENDERS:
+            for cond in CONDITIONS:
+                cats = get_categories(temp, cond, gender)
+                rows.append(
+                    (
+                        cats,
+                        select_top(cats),
+                        select_bottom(cats),
+                        select_footwear(cats, weather=cond),
+                        select_accessory(cats, weather=cond),
+                    )
+                )
+    vocab, codes = {}, {}
+    for j, lbl in enumerate(LABELS):
+        values = [r[j + 1] for r in rows]
+        vocab[lbl] = np.array(sorted(set(values)))
+        codes[lbl] = np.searchsorted(vocab[lbl], values).astype(np.uint8)
+    return vocab, codes, [r[0] for r in rows]
+
+
+def table_index(temperature, gender_code, condition_code):
+    return (
+        (np.asarray(temperature) - TEMP_RANGE[0]) * len(GENDERS) + gender_code
+    ) * len(CONDITIONS) + condition_code
+
+
+# FEATURE DRAWS
+def draw_features(rs, n):
+    """
+    Feature columns from numpy RandomState `rs`, drawn in the original script's
+    order. Categorical features come back as codes (index into CONDITIONS,
+    GENDERS, DAYS, SEASONS).
+    """
+    return {
+        "temperature": rs.randint(*TEMP_RANGE, n),
+        "humidity": rs.randint(*HUMIDITY_RANGE, n),
+        "wind_speed": rs.uniform(*WIND_RANGE, n),
+        "weather_condition": rs.choice(len(CONDITIONS), n, p=CONDITION_P),
+        "gender": rs.choice(len(GENDERS), n),
+        "hour": rs.randint(*HOURS, n),
+        "day_of_week": rs.choice(len(DAYS), n),
+        "season": rs.choice(len(SEASONS), n),
     }
-)
-
-# Full outfit categories
-data["full_outfit_categories"] = [
-    get_categories(t, w, g)
-    for t, w, g in zip(data.temperature, data.weather_condition, data.gender)
-]
 
-# ML labels with weather-awareness for accessories/footwear
-data["top_label"] = data["full_outfit_categories"].apply(select_top)
-data["bottom_label"] = data["full_outfit_categories"].apply(select_bottom)
-data["footwear_label"] = [
-    select_footwear(cat, weather=w)
-    for cat, w in zip(data.full_outfit_categories, data.weather_condition)
-]
-data["accessory_label"] = [
-    select_accessory(cat, weather=w)
-    for cat, w in zip(data.full_outfit_categories, data.weather_condition)
-]
 
-# SAVE CSV
-data.to_csv("data/synthetic_30k.csv", index=False)
-print("Dataset saved → data/synthetic_30k.csv   Shape:", data.shape)
+# BUILD DATAFRAME
+def generate(n, seed=SEED, table=None, with_categories=True, rs=None):
+    """
+    The labelled dataset as a DataFrame (deterministic for a given seed, or
+    drawn from RandomState `rs`), with categorical dtypes for the string
+    columns.
+    """
+    vocab, codes, categories = table or build_label_table()
+    f = draw_features(rs if rs is not None else np.random.RandomState(seed), n)
+    cond = f["weather_condition"]
+    idx = table_index(f["temperature"], f["gender"], cond)
+
+    data = pd.DataFrame(
+        {
+            "temperature": f["temperature"].astype(np.int16),
+            "humidity": f["humidity"].astype(np.int16),
+            "wind_speed": f["wind_speed"],
+            "weather_condition": pd.Categorical.from_codes(cond, CONDITIONS),
+            "rain": np.isin(cond, RAIN_CODES).astype(np.int8),
+            "gender": pd.Categorical.from_codes(f["gender"], GENDERS),
+            "hour": f["hour"].astype(np.int8),
+            "day_of_week": pd.Categorical.from_codes(f["day_of_week"], DAYS),
+            "season": pd.Categorical.from_codes(f["season"], SEASONS),
+        }
+    )
+    if with_categories:
+        # Full outfit categories (the same list object for rows sharing a key)
+        table_cats = np.empty(len(categories), dtype=object)
+        table_cats[:] = categories
+        data["full_outfit_categories"] = table_cats[idx]
+    for lbl in LABELS:
+        data[lbl] = pd.Categorical.from_codes(codes[lbl][idx], vocab[lbl])
+    return data
+
+
+# STREAMING (chunked Parquet)
+def chunk_random_state(seed, chunk):
+    """Independent, reproducible stream for chunk number `chunk` of a run."""
+    return np.random.RandomState(
+        np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(chunk,)))
+    )
+
+
+def chunk_path(out_dir, chunk):
+    return os.path.join(out_dir, f"part-{chunk:05d}.parquet")
+
+
+def write_chunk(out_dir, chunk, n, seed=SEED, table=None):
+    """Generate chunk `chunk` (n rows) and write it as one Parquet part file."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    data = generate(
+        n, table=table, with_categories=False, rs=chunk_random_state(seed, chunk)
+    )
+    path = chunk_path(out_dir, chunk)
+    pq.write_table(pa.Table.from_pandas(data, preserve_index=False), path)
+    return path
+
+
+def chunk_sizes(n, chunk_rows):
+    return [min(chunk_rows, n - start) for start in range(0, n, chunk_rows)]
+
+
+_TABLE = None  # label table, built once per process
+
+
+def _write_shard(job):
+    global _TABLE
+    if _TABLE is None:
+        _TABLE = build_label_table()
+    out_dir, chunk, n, seed = job
+    path = write_chunk(out_dir, chunk, n, seed, _TABLE)
+    return {"file": os.path.basename(path), "rows": n, "sha256": sha256_file(path)}
+
+
+def write_parquet(n, out_dir, seed=SEED, chunk_rows=1_000_000, workers=1):
+    """
+    Stream `n` rows into `out_dir`/part-NNNNN.parquet, one chunk in memory per
+    worker at a time, and write `out_dir`/manifest.json. Chunk i is drawn from
+    its own seed stream, so the data (and manifest) depend only on
+    (n, seed, chunk_rows), not on `workers`. The outfit category lists are not
+    written; the label columns are dictionary-encoded (pandas categoricals).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(out_dir, "part-*.parquet")) + glob.glob(
+        os.path.join(out_dir, MANIFEST)
+    ):
+        os.remove(stale)
+    jobs = [
+        (out_dir, chunk, size, seed)
+        for chunk, size in enumerate(chunk_sizes(n, chunk_rows))
+    ]
+    if workers > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            parts = list(pool.map(_write_shard, jobs))
+    else:
+        parts = [_write_shard(job) for job in jobs]
+
+    schema = generate(1, table=_TABLE or build_label_table(), with_categories=False)
+    manifest = {
+        "rows": n,
+        "seed": seed,
+        "chunk_rows": chunk_rows,
+        "columns": {c: str(schema[c].dtype) for c in schema.columns},
+        "categories": {
+            c: list(schema[c].cat.categories)
+            for c in schema.columns
+            if isinstance(schema[c].dtype, pd.CategoricalDtype)
+        },
+        "parts": parts,
+    }
+    with open(os.path.join(out_dir, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the synthetic dataset")
+    parser.add_argument("--rows", type=int, default=N)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--format",
+        choices=["csv", "parquet"],
+        default="csv",
+        help="csv: one file built in memory; parquet: streamed chunk files",
+    )
+    parser.add_argument("--chunk-rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="parquet: processes writing chunks"
+    )
+    parser.add_argument(
+        "--out", help="default data/synthetic_30k.csv, or data/synthetic/ for parquet"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.format == "parquet":
+        out = args.out or "data/synthetic"
+        manifest = write_parquet(
+            args.rows, out, args.seed, args.chunk_rows, args.workers
+        )
+        took = time.perf_counter() - started
+        print(
+            f"Dataset saved → {out}/ ({len(manifest['parts'])} parts, "
+            f"{args.rows} rows, manifest {MANIFEST})"
+        )
+        print(
+            f"Generated and written in {took:.2f} s with {args.workers} worker(s)"
+            f" ({args.rows / took / 1e6:.2f} M rows/s)"
+        )
+        return
+
+    out = args.out or "data/synthetic_30k.csv"
+    data = generate(args.rows, args.seed)
+    generated = time.perf_counter() - started
+
+    # SAVE CSV
+    data.to_csv(out, index=False)
+    print(f"Dataset saved → {out}   Shape: {data.shape}")
+    print(
+        f"Generated in {generated:.2f} s, written in "
+        f"{time.perf_counter() - started - generated:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+"""
+The serving FeatureEncoder against the committed pipeline preprocessor
+(models/preprocessor.pkl) on 5000 synthetic dataset rows; train.py runs the
+same check on the training data after every one-hot run.
+"""
+
+import os
+import pickle
+
+from predictor import FEATURES, FeatureEncoder
+from synthetic_30k import generate
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "models")
+
+
+def test_encoder_matches_preprocessor():
+    with open(os.path.join(MODEL_DIR, "preprocessor.pkl"), "rb") as f:
+        preprocessor = pickle.load(f)
+    rows = generate(5000, seed=1)[FEATURES].astype(object).to_dict("records")
+    FeatureEncoder.from_preprocessor(preprocessor).check_against(preprocessor, rows)
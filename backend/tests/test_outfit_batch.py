@@ -0,0 +1,48 @@
+"""
+/outfit/batch when no city resolves, on the XGBoost backend without the memo
+(so the request reaches the boosters with an empty batch).
+
+    cd backend && python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+os.environ.setdefault("OPENWEATHER_KEY", "test")
+os.environ["MODEL_BACKEND"] = "xgboost"
+os.environ["OUTFIT_MEMO"] = "0"
+
+import app  # noqa: E402  (reads the settings above at import)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def city_not_found(city):
+        raise HTTPException(status_code=404, detail=f"City '{city}' not found")
+
+    monkeypatch.setattr(app, "fetch_current_weather_for_model", city_not_found)
+    with TestClient(app.app) as client:
+        yield client
+
+
+def test_every_city_failing_returns_errors(client):
+    response = client.post(
+        "/outfit/batch",
+        json={"cities": ["Nowhere", "Atlantis"], "genders": ["male", "female"]},
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["errors"] == 4
+    assert [item["error"]["status_code"] for item in body["items"]] == [404] * 4
+
+
+def test_predict_codes_on_no_rows():
+    predictor = app.load_predictor()
+    codes = predictor.predict_codes(np.zeros((0, predictor.encoder.n_features)))
+    assert sorted(codes) == sorted(predictor.classes)
+    assert all(c.shape == (0,) and c.dtype.kind == "i" for c in codes.values())
+    assert predictor.predict_outfits([]) == []
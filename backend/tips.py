@@ -0,0 +1,221 @@
+"""
+Outfit tips as a compiled rule table.
+
+The tip rules only look at each garment label, the gender, which temperature
+band the reading falls in and the rain / snow flags. Every label is classified
+against the keyword lists once (e.g. a top is warm / shirt / other), tips are
+assembled from that classification, and the result for each
+(outfit, gender, band, rain, snow) key is memoized.
+"""
+
+import functools
+
+WARM_TOP_KEYWORDS = (
+    "puffer_jacket",
+    "quilted_jacket",
+    "insulated_parka",
+    "coat",
+    "thermal",
+    "hoodie",
+    "sweater",
+)
+SHIRT_TOP_KEYWORDS = ("tshirt", "shirt")
+SNOW_FOOTWEAR_KEYWORDS = ("boot", "snow", "insulated", "waterproof")
+RAIN_FOOTWEAR_KEYWORDS = ("gumboot", "rainboot", "waterproof", "boot")
+COLD_ACCESSORY_KEYWORDS = ("scarf", "gloves", "hat", "beanie")
+
+# Temperature bands, split at every threshold the rules test (°C)
+NO_TEMP, FREEZING, COLD, COOL, MILD, HOT = range(6)  # -, <=5, <7, <20, <26, >=26
+
+TOP_WARM, TOP_SHIRT, TOP_OTHER = range(3)
+
+
+def temperature_band(temp):
+    if temp is None:
+        return NO_TEMP
+    if temp <= 5:
+        return FREEZING
+    if temp < 7:
+        return COLD
+    if temp < 20:
+        return COOL
+    if temp >= 26:
+        return HOT
+    return MILD  # 20 <= temp < 26, and NaN, which fails every comparison
+
+
+def _has_any(label, keywords):
+    return any(k in label for k in keywords)
+
+
+def classify_top(top):
+    if _has_any(top, WARM_TOP_KEYWORDS):
+        return TOP_WARM
+    if _has_any(top, SHIRT_TOP_KEYWORDS):
+        return TOP_SHIRT
+    return TOP_OTHER
+
+
+def classify_bottom(bottom):
+    """(is a skirt, is shorts)"""
+    return "skirt" in bottom, "shorts" in bottom
+
+
+def classify_footwear(footwear):
+    """(fine for snow, fine for rain)"""
+    return (
+        _has_any(footwear, SNOW_FOOTWEAR_KEYWORDS),
+        _has_any(footwear, RAIN_FOOTWEAR_KEYWORDS),
+    )
+
+
+def classify_accessory(accessory):
+    """(worn at all, already cold-weather gear)"""
+    return (
+        bool(accessory) and accessory != "none",
+        _has_any(accessory, COLD_ACCESSORY_KEYWORDS),
+    )
+
+
+CLASSIFIERS = {
+    "top": classify_top,
+    "bottom": classify_bottom,
+    "footwear": classify_footwear,
+    "accessory": classify_accessory,
+}
+
+
+class TipsEngine:
+    """
+    Tips for a decoded outfit. `vocabulary` ({part: labels}) is classified up
+    front; labels outside it are classified on first sight. Results are
+    memoized per (outfit labels, gender, temperature band, rain, snow).
+    """
+
+    def __init__(self, vocabulary=None, maxsize=4096):
+        self._kinds = {part: {} for part in CLASSIFIERS}
+        self.maxsize = maxsize
+        # tips are a pure function of the key, so a plain LRU (no TTL) suffices
+        self._cached = functools.lru_cache(maxsize=maxsize)(self._build)
+        if vocabulary:
+            self.compile(vocabulary)
+
+    def compile(self, vocabulary):
+        """Classify every label in {part: labels}."""
+        for part, labels in vocabulary.items():
+            for label in labels:
+                self._kind(part, str(label).lower())
+
+    def _kind(self, part, label):
+        kinds = self._kinds[part]
+        kind = kinds.get(label)
+        if kind is None:
+            kind = kinds[label] = CLASSIFIERS[part](label)
+        return kind
+
+    @staticmethod
+    def key(outfit, gender, weather):
+        temp = weather.get("temperature_c", weather.get("temp_c"))
+        cond = weather.get("weather_condition", "").lower()
+        return (
+            outfit.get("top", "").lower(),
+            outfit.get("bottom", "").lower(),
+            outfit.get("footwear", "").lower(),
+            outfit.get("accessory", "").lower(),
+            gender,
+            temperature_band(temp),
+            bool(weather.get("rain", False) or "rain" in cond),
+            bool(weather.get("snow", False) or "snow" in cond),
+        )
+
+    def tips(self, outfit, gender, weather):
+        """Tips list for one outfit (a new list; callers may modify it)."""
+        return list(self._cached(*self.key(outfit, gender, weather)))
+
+    def tips_batch(self, items):
+        """`tips` for each (outfit, gender, weather) in `items`."""
+        return [self.tips(outfit, gender, weather) for outfit, gender, weather in items]
+
+    def _build(self, top, bottom, footwear, accessory, gender, band, rain, snow):
+        tips = []
+
+        kind = self._kind("top", top)
+        if kind == TOP_WARM:
+            tips.append(f"{top} provides warmth and is suitable for cold weather.")
+        elif kind == TOP_SHIRT:
+            tips.append(
+                f"{top.capitalize()} is suitable for mild or warm temperatures."
+            )
+        else:
+            tips.append(
+                f"{top.capitalize()} can be worn depending on personal comfort."
+            )
+
+        is_skirt, is_shorts = self._kind("bottom", bottom)
+        if is_skirt and gender != "female":
+            tips.append(f"A {bottom} may feel cold for {gender}.")
+        elif is_shorts and band in (FREEZING, COLD, COOL):
+            tips.append("Shorts may feel chilly at this temperature.")
+        else:
+            tips.append(f"{bottom.capitalize()} is suitable for current weather.")
+
+        snow_ok, rain_ok = self._kind("footwear", footwear)
+        if snow:
+            if not snow_ok:
+                tips.append(
+                    "Snowy conditions — insulated waterproof boots are recommended."
+                )
+            else:
+                tips.append(f"{footwear.capitalize()} are appropriate for snow.")
+        elif rain:
+            if not rain_ok:
+                tips.append(
+                    "Rainy weather — waterproof footwear will keep your feet dry."
+                )
+            else:
+                tips.append(f"{footwear.capitalize()} are suitable for rain.")
+        else:
+            tips.append(f"{footwear.capitalize()} are suitable for daily use.")
+
+        # weather overrides come first, even when the accessory is "none"
+        worn, cold_gear = self._kind("accessory", accessory)
+        if rain:
+            tips.append("Rainy weather — carry an umbrella or wear a raincoat.")
+        elif snow:
+            tips.append(
+                "Snowy weather — stay warm: wear sherpa topi, gloves, and a scarf."
+            )
+        elif worn and band != NO_TEMP:
+            if band == FREEZING:
+                if not cold_gear:
+                    tips.append(
+                        "Add scarf, gloves, or a warm hat for very cold weather."
+                    )
+                else:
+                    tips.append(f"Wear {accessory} to keep warm.")
+            elif band == HOT:
+                tips.append(f"Wear {accessory} to stay cool and protected from sun.")
+            else:
+                tips.append(f"{accessory.capitalize()} can complement your outfit.")
+
+        # layering advice
+        if band in (FREEZING, COLD):
+            tips.append(
+                "It's too cold — layering is recommended: base layer + insulating layer + outer shell."
+            )
+
+        return tuple(tips)
+
+    def clear(self):
+        self._cached.cache_clear()
+
+    def stats(self):
+        info = self._cached.cache_info()
+        lookups = info.hits + info.misses
+        return {
+            "size": info.currsize,
+            "maxsize": info.maxsize,
+            "hits": info.hits,
+            "misses": info.misses,
+            "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -1,107 +1,582 @@
-import pandas as pd
-import numpy as np
+"""
+Train the four label models and write the serving artifacts.
+
+    cd backend && python train.py                       # one label at a time
+    cd backend && python train.py --label-workers 4     # all labels concurrently
+    cd backend && python train.py --data data/synthetic --external-memory
+    cd backend && python train.py --encoding categorical   # native categorical splits
+
+The encoded design matrix (noisy features through the one-hot preprocessor),
+the per-label train / test split and the fitted encoders are cached under
+data/cache, keyed by the dataset's hash and the feature configuration, so
+retraining on the same data skips reading and encoding it.
+"""
+
+import argparse
+import hashlib
+import json
+import os
 import pickle
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import LabelEncoder, OneHotEncoder
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
 from sklearn.compose import ColumnTransformer
+from sklearn.metrics import classification_report
+from sklearn.model_selection import train_test_split
 from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import LabelEncoder, OneHotEncoder
 from xgboost import XGBClassifier
-from sklearn.metrics import classification_report
 
-# Load synthetic dataset
-data = pd.read_csv("data/synthetic_30k.csv")
-print("Loaded dataset:", data.shape)
-
-# Features & Labels
-features = [
-    "temperature",
-    "humidity",
-    "wind_speed",
-    "rain",
-    "gender",
-    "hour",
-    "day_of_week",
-    "season",
-    "weather_condition",
-]
-labels = ["top_label", "bottom_label", "footwear_label", "accessory_label"]
-
-X = data[features].copy()
-y = {lbl: data[lbl] for lbl in labels}
-
-# small noise to numeric features
-np.random.seed(42)
-X["temperature"] = X["temperature"] + np.random.normal(0, 0.5, size=len(X))
-X["humidity"] = X["humidity"] + np.random.normal(0, 1, size=len(X))
-X["wind_speed"] = X["wind_speed"] + np.random.normal(0, 0.2, size=len(X))
-
-# Encode categorical features
-cat_features = ["gender", "day_of_week", "season", "weather_condition"]
-num_features = ["temperature", "humidity", "wind_speed", "rain", "hour"]
-
-preprocessor = ColumnTransformer(
-    [
-        ("cat", OneHotEncoder(handle_unknown="ignore"), cat_features),
-    ],
-    remainder="passthrough",
+from hashing import dataset_digest, parquet_parts
+from model_bundle import write_bundle
+from predictor import (
+    CAT_FEATURES,
+    ENCODERS,
+    FEATURES,
+    LABELS,
+    NUM_FEATURES,
+    FeatureEncoder,
+    MultiHeadPredictor,
 )
 
-# Label encoders for each target
-label_encoders = {}
-for lbl in labels:
-    le = LabelEncoder()
-    y[lbl] = le.fit_transform(y[lbl])
-    label_encoders[lbl] = le
-print("Label encoders created")
-
-# Save encoders for app use
-with open("models/global_label_encoders.pkl", "wb") as f:
-    pickle.dump(label_encoders, f)
-print("Saved label encoders → models/global_label_encoders.pkl")
-
-# Train models for each label
-trained_models = {}
-for lbl in labels:
-    print(f"\nTraining {lbl}...")
-
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y[lbl], test_size=0.2, random_state=42, stratify=y[lbl]
-    )
+# XGBClassifier hyperparameters (n_estimators = boosting rounds)
+HYPERPARAMS = {
+    "n_estimators": 150,
+    "max_depth": 3,  # shallower tree for generalization
+    "learning_rate": 0.1,
+    "gamma": 1,  # regularization
+    "min_child_weight": 2,  # prevent overfitting small leaves
+    "subsample": 0.8,  # row sampling
+    "colsample_bytree": 0.8,  # column sampling
+}
+NOISE = {"temperature": 0.5, "humidity": 1.0, "wind_speed": 0.2}  # std dev
+NOISE_SEED = 42
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+DESIGN_FORMAT = 1
+
+
+def load_dataset(path):
+    """A CSV file, or a directory of Parquet parts (synthetic_30k.py --format parquet)."""
+    if os.path.isdir(path):
+        data = pd.concat(
+            [pd.read_parquet(p) for p in parquet_parts(path)], ignore_index=True
+        )
+    else:
+        data = pd.read_csv(path)
+    print("Loaded dataset:", data.shape)
+    return data
+
+
+def sample_rows(path, n=5000, seed=0, head=50_000):
+    """
+    `n` random raw input rows (FEATURES dicts) from the first `head` rows of
+    dataset `path`, so a check costs the same on any dataset size
+    (synthetic_30k.py draws every row independently, so the head is as good a
+    sample as the whole file).
+    """
+    if os.path.isdir(path):
+        import pyarrow.parquet as pq
+
+        batches = pq.ParquetFile(parquet_parts(path)[0]).iter_batches(
+            batch_size=head, columns=FEATURES
+        )
+        data = next(batches).to_pandas()
+    else:
+        data = pd.read_csv(path, usecols=FEATURES, nrows=head)
+    data = data.sample(min(n, len(data)), random_state=seed)
+    return data[FEATURES].to_dict("records")
+
 
-    # Pipeline with XGBoost
-    pipe = Pipeline(
+def add_noise(X, seed=42):
+    """Small noise on the numeric features (in place)."""
+    np.random.seed(seed)
+    for f, std in NOISE.items():
+        X[f] = X[f] + np.random.normal(0, std, size=len(X))
+    return X
+
+
+def make_preprocessor():
+    # Encode categorical features; numeric features pass through
+    return ColumnTransformer(
         [
-            ("preprocessor", preprocessor),
-            (
-                "classifier",
-                XGBClassifier(
-                    n_estimators=150,
-                    max_depth=3,  # shallower tree for generalization
-                    learning_rate=0.1,
-                    gamma=1,  # regularization
-                    min_child_weight=2,  # prevent overfitting small leaves
-                    subsample=0.8,  # row sampling
-                    colsample_bytree=0.8,  # column sampling
-                    eval_metric="mlogloss",
-                    random_state=42,
-                ),
+            ("cat", OneHotEncoder(handle_unknown="ignore"), CAT_FEATURES),
+        ],
+        remainder="passthrough",
+    )
+
+
+def make_classifier(
+    n_jobs=None, tree_method="hist", n_estimators=None, feature_types=None
+):
+    params = dict(HYPERPARAMS)
+    if n_estimators:
+        params["n_estimators"] = n_estimators
+    if feature_types:
+        # "c" columns hold category codes, split on natively by XGBoost
+        params.update(enable_categorical=True, feature_types=feature_types)
+    return XGBClassifier(
+        **params,
+        eval_metric="mlogloss",
+        random_state=42,
+        tree_method=tree_method,
+        n_jobs=n_jobs,
+    )
+
+
+# DESIGN MATRIX CACHE
+def design_key(path, encoding="onehot"):
+    """Cache key: the dataset's contents plus everything that shapes the matrix."""
+    config = {
+        "format": DESIGN_FORMAT,
+        "encoding": encoding,
+        "features": FEATURES,
+        "categorical": CAT_FEATURES,
+        "labels": LABELS,
+        "noise": NOISE,
+        "noise_seed": NOISE_SEED,
+        "test_size": TEST_SIZE,
+        "split_seed": SPLIT_SEED,
+    }
+    h = hashlib.sha256(dataset_digest(path).encode())
+    h.update(json.dumps(config, sort_keys=True).encode())
+    return h.hexdigest()[:16]
+
+
+def build_design(data, encoding="onehot"):
+    """
+    Noisy features encoded once, label codes, and each label's stratified
+    train / test row indices. "onehot" encodes with a single fitted
+    preprocessor; "categorical" with category codes over the sorted values of
+    each categorical feature (the vocabulary OneHotEncoder would learn).
+    """
+    X = add_noise(data[FEATURES].copy(), seed=NOISE_SEED)
+    if encoding == "onehot":
+        preprocessor = make_preprocessor().fit(X)
+        encoder = FeatureEncoder.from_preprocessor(preprocessor)
+        encoded = preprocessor.transform(X)
+        if hasattr(encoded, "toarray"):
+            encoded = encoded.toarray()
+    else:
+        preprocessor = None
+        encoder = ENCODERS[encoding](
+            {f: sorted(X[f].astype(str).unique()) for f in CAT_FEATURES}
+        )
+        columns = {f: X[f].to_numpy() for f in NUM_FEATURES}
+        for f in CAT_FEATURES:
+            columns[f] = category_codes(X[f], encoder.categories[f])
+        encoded = encoder.encode_codes(columns)
+    design = {
+        "X": np.ascontiguousarray(encoded, dtype=np.float32),
+        "encoding": encoding,
+        "encoder": encoder,
+        "preprocessor": preprocessor,
+        "label_encoders": {},
+        "y": {},
+        "splits": {},
+    }
+    for lbl in LABELS:
+        le = LabelEncoder()
+        design["y"][lbl] = y = le.fit_transform(data[lbl])
+        design["label_encoders"][lbl] = le
+        design["splits"][lbl] = train_test_split(
+            np.arange(len(y)), test_size=TEST_SIZE, random_state=SPLIT_SEED, stratify=y
+        )
+    return design
+
+
+def save_design(design, prefix):
+    """`prefix`.npz holds the arrays, `prefix`.pkl any fitted preprocessor."""
+    os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+    encoder = design["encoder"]
+    arrays = {
+        "X": design["X"],
+        "build_seconds": np.float64(design["build_seconds"]),
+        "encoding": np.asarray(design["encoding"]),
+        "numeric": np.asarray(encoder.numeric),
+    }
+    for f in CAT_FEATURES:
+        arrays[f"categories__{f}"] = np.asarray(encoder.categories[f])
+    for lbl in LABELS:
+        arrays[f"y__{lbl}"] = design["y"][lbl]
+        arrays[f"classes__{lbl}"] = np.asarray(
+            design["label_encoders"][lbl].classes_, dtype=str
+        )
+        arrays[f"train__{lbl}"], arrays[f"test__{lbl}"] = design["splits"][lbl]
+    # the .npz is written last and atomically: its presence marks a complete entry
+    if design["preprocessor"] is not None:
+        with open(prefix + ".pkl", "wb") as f:
+            pickle.dump(design["preprocessor"], f)
+    with open(prefix + ".tmp.npz", "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(prefix + ".tmp.npz", prefix + ".npz")
+
+
+def load_design(prefix):
+    with np.load(prefix + ".npz") as z:
+        encoding = str(z["encoding"])
+        design = {
+            "X": z["X"],
+            "build_seconds": float(z["build_seconds"]),
+            "encoding": encoding,
+            "encoder": ENCODERS[encoding](
+                {f: z[f"categories__{f}"].tolist() for f in CAT_FEATURES},
+                numeric=z["numeric"].tolist(),
             ),
-        ]
+            "preprocessor": None,
+            "label_encoders": {},
+            "y": {},
+            "splits": {},
+        }
+        for lbl in LABELS:
+            le = LabelEncoder()
+            le.classes_ = z[f"classes__{lbl}"].astype(object)
+            design["label_encoders"][lbl] = le
+            design["y"][lbl] = z[f"y__{lbl}"]
+            design["splits"][lbl] = z[f"train__{lbl}"], z[f"test__{lbl}"]
+    if encoding == "onehot":
+        with open(prefix + ".pkl", "rb") as f:
+            design["preprocessor"] = pickle.load(f)
+    return design
+
+
+def design_matrix(path, cache_dir="data/cache", rebuild=False, encoding="onehot"):
+    """
+    The design for dataset `path` (see build_design), from `cache_dir` when an
+    entry for this dataset and feature configuration exists. Hyperparameter
+    runs can call this directly and fit on design["X"][design["splits"][lbl][0]].
+    Pass cache_dir=None to neither read nor write the cache.
+    """
+    started = time.perf_counter()
+    prefix = (
+        os.path.join(cache_dir, f"design-{design_key(path, encoding)}")
+        if cache_dir
+        else None
     )
+    if prefix and not rebuild and os.path.exists(prefix + ".npz"):
+        design = load_design(prefix)
+        took = time.perf_counter() - started
+        print(
+            f"Design matrix {design['X'].shape} loaded from {prefix}.npz in "
+            f"{took:.2f} s (building it took {design['build_seconds']:.2f} s; "
+            f"saved {design['build_seconds'] - took:.2f} s)"
+        )
+        return design
+    design = build_design(load_dataset(path), encoding)
+    design["build_seconds"] = time.perf_counter() - started
+    print(f"Design matrix {design['X'].shape} built in {design['build_seconds']:.2f} s")
+    if prefix:
+        save_design(design, prefix)
+        print(f"Design matrix cached → {prefix}.npz")
+    return design
+
+
+def train_label(lbl, design, n_jobs=None, tree_method="hist", n_estimators=None):
+    """Fit one label's classifier; returns (classifier, test report, seconds)."""
+    started = time.perf_counter()
+    X, y = design["X"], design["y"][lbl]
+    train, test = design["splits"][lbl]
+
+    feature_types = design["encoder"].feature_types
+    clf = make_classifier(n_jobs, tree_method, n_estimators, feature_types)
+    clf.fit(X[train], y[train])
+
+    report = classification_report(y[test], clf.predict(X[test]))
+    return clf, report, time.perf_counter() - started
+
+
+# OUT-OF-CORE TRAINING
+def iter_frames(path, batch_rows):
+    """DataFrames of at most `batch_rows` rows from a CSV or a Parquet part directory."""
+    if os.path.isdir(path):
+        import pyarrow.parquet as pq
+
+        for part in parquet_parts(path):
+            for batch in pq.ParquetFile(part).iter_batches(batch_size=batch_rows):
+                yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=batch_rows)
+
+
+def scan_vocabulary(path, batch_rows):
+    """Sorted values of every categorical feature and label, and the row count."""
+    values = {c: set() for c in CAT_FEATURES + LABELS}
+    rows = 0
+    for frame in iter_frames(path, batch_rows):
+        rows += len(frame)
+        for c, seen in values.items():
+            seen.update(str(v) for v in frame[c].unique())
+    return {c: sorted(v) for c, v in values.items()}, rows
+
+
+def category_codes(values, categories):
+    """Index of each value in `categories` (-1 if absent)."""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(str)
+    return pd.Categorical(values, categories=categories).codes
+
+
+def encoded_batches(path, encoder, classes, batch_rows, holdout=5, seed=42):
+    """
+    (X, {label: class codes}, test mask) per batch. Numeric noise is drawn from
+    a per-batch seed stream, so every pass over the data sees the same values;
+    every `holdout`-th row by global position is in the test partition.
+    """
+    offset = 0
+    for i, frame in enumerate(iter_frames(path, batch_rows)):
+        rs = np.random.RandomState(
+            np.random.PCG64(np.random.SeedSequence(seed, spawn_key=(i,)))
+        )
+        columns = {f: frame[f].to_numpy() for f in NUM_FEATURES}
+        for f, std in NOISE.items():
+            columns[f] = columns[f] + rs.normal(0, std, size=len(frame))
+        for f in CAT_FEATURES:
+            columns[f] = category_codes(frame[f], encoder.categories[f])
+        codes = {lbl: category_codes(frame[lbl], classes[lbl]) for lbl in LABELS}
+        test = (offset + np.arange(len(frame))) % holdout == 0
+        offset += len(frame)
+        yield encoder.encode_codes(columns), codes, test
+
+
+class TrainingBatches(xgb.DataIter):
+    """Feeds one label's training partition to XGBoost batch by batch."""
+
+    def __init__(self, label, batches, cache_prefix, feature_types=None):
+        self.label = label
+        self.batches = batches  # callable returning a fresh encoded_batches()
+        self.feature_types = feature_types
+        self._it = None
+        super().__init__(cache_prefix=cache_prefix)
+
+    def reset(self):
+        self._it = None
+
+    def next(self, input_data):
+        if self._it is None:
+            self._it = self.batches()
+        batch = next(self._it, None)
+        if batch is None:
+            return False
+        X, codes, test = batch
+        input_data(
+            data=X[~test],
+            label=codes[self.label][~test],
+            feature_types=self.feature_types,
+        )
+        return True
+
+
+def train_external(args):
+    """
+    Train from `args.data` without loading it: each label's training rows are
+    streamed through a DataIter into an external-memory quantile DMatrix
+    (pages cached on disk), then the held-out rows are scored in one more
+    streaming pass. Writes only the model bundle (there are no sklearn
+    pipelines to pickle).
+    """
+    vocab, n_rows = scan_vocabulary(args.data, args.batch_rows)
+    print(f"Streaming dataset: {n_rows} rows in batches of {args.batch_rows}")
+    encoder = ENCODERS[args.encoding]({f: vocab[f] for f in CAT_FEATURES})
+    classes = {lbl: vocab[lbl] for lbl in LABELS}
+
+    def batches():
+        return encoded_batches(args.data, encoder, classes, args.batch_rows)
+
+    params = dict(HYPERPARAMS)
+    rounds = params.pop("n_estimators")
+    rounds = args.n_estimators or rounds
+    boosters, total = {}, time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=args.cache_dir) as cache:
+        for lbl in LABELS:
+            started = time.perf_counter()
+            it = TrainingBatches(
+                lbl, batches, os.path.join(cache, lbl), encoder.feature_types
+            )
+            dtrain = xgb.ExtMemQuantileDMatrix(
+                it,
+                nthread=args.threads,
+                enable_categorical=encoder.feature_types is not None,
+            )
+            boosters[lbl] = xgb.train(
+                {
+                    **params,
+                    "objective": "multi:softprob",
+                    "num_class": len(classes[lbl]),
+                    "eval_metric": "mlogloss",
+                    "seed": 42,
+                    "tree_method": args.tree_method,
+                    "nthread": args.threads,
+                },
+                dtrain,
+                num_boost_round=rounds,
+            )
+            del dtrain, it
+            print(f"{lbl} trained in {time.perf_counter() - started:.2f} s")
+    print(f"Total training time {time.perf_counter() - total:.2f} s")
+
+    multihead = MultiHeadPredictor(encoder, boosters, classes)
+    ensemble = multihead.export_ensemble()
+
+    # Held-out partition: confusion matrices, and the tree export must reproduce
+    # XGBoost on every held-out row
+    confusion = {lbl: np.zeros((len(classes[lbl]),) * 2, np.int64) for lbl in LABELS}
+    for X, codes, test in batches():
+        X = X[test]
+        xgb_codes = multihead.predict_codes(X, backend="xgboost")
+        for lbl, got in ensemble.predict_codes(X).items():
+            if not np.array_equal(got, xgb_codes[lbl]):
+                raise RuntimeError(f"{lbl}: tree export disagrees with XGBoost")
+            np.add.at(confusion[lbl], (codes[lbl][test], xgb_codes[lbl]), 1)
+    for lbl, cm in confusion.items():
+        tp = np.diag(cm)
+        support = cm.sum(axis=1)
+        f1 = 2 * tp / np.maximum(support + cm.sum(axis=0), 1)
+        print(
+            f"{lbl:<16} held-out accuracy {tp.sum() / cm.sum():.4f}"
+            f"  macro F1 {f1[support > 0].mean():.4f}  ({cm.sum()} rows)"
+        )
+    multihead.use_ensemble(ensemble)
+
+    manifest = write_bundle(multihead, "models/bundle")
+    print(f"Model bundle {manifest['version']} saved → models/bundle")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the outfit label models")
+    parser.add_argument("--data", default="data/synthetic_30k.csv")
+    parser.add_argument(
+        "--label-workers",
+        type=int,
+        default=1,
+        help="labels trained concurrently (threads; XGBoost releases the GIL)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=os.cpu_count(),
+        help="total XGBoost thread budget, split evenly across label workers",
+    )
+    parser.add_argument("--tree-method", default="hist")
+    parser.add_argument("--n-estimators", type=int, help="override boosting rounds")
+    parser.add_argument(
+        "--encoding",
+        choices=sorted(ENCODERS),
+        default="onehot",
+        help="categorical features as one-hot columns or native category codes",
+    )
+    parser.add_argument(
+        "--external-memory",
+        action="store_true",
+        help="stream --data in batches into an external-memory DMatrix",
+    )
+    parser.add_argument("--batch-rows", type=int, default=250_000)
+    parser.add_argument("--cache-dir", help="external-memory page cache location")
+    parser.add_argument("--design-cache", default="data/cache")
+    parser.add_argument(
+        "--no-design-cache", action="store_true", help="neither read nor write it"
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="rebuild the cached design matrix"
+    )
+    args = parser.parse_args()
+
+    if args.external_memory:
+        train_external(args)
+        return
+
+    design = design_matrix(
+        args.data,
+        None if args.no_design_cache else args.design_cache,
+        args.rebuild,
+        args.encoding,
+    )
+    label_encoders = design["label_encoders"]
+    onehot = design["preprocessor"] is not None
+
+    # Save encoders for app use (the legacy pickles are one-hot pipelines only)
+    if onehot:
+        with open("models/global_label_encoders.pkl", "wb") as f:
+            pickle.dump(label_encoders, f)
+        print("Saved label encoders → models/global_label_encoders.pkl")
+
+    # Train models for each label; concurrent labels share the thread budget so
+    # cores are not oversubscribed
+    workers = max(1, min(args.label_workers, len(LABELS)))
+    n_jobs = max(1, args.threads // workers)
+    print(
+        f"\nTraining {len(LABELS)} labels, {workers} at a time, "
+        f"{n_jobs} XGBoost thread(s) each ({args.tree_method})"
+    )
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        results = list(
+            pool.map(
+                lambda lbl: train_label(
+                    lbl, design, n_jobs, args.tree_method, args.n_estimators
+                ),
+                LABELS,
+            )
+        )
+    total = time.perf_counter() - started
+
+    trained_models = {}
+    for lbl, (clf, report, _) in zip(LABELS, results):
+        print(f"\n{lbl}\n{report}")
+        if not onehot:
+            continue
+
+        # Save pipeline: the shared, already fitted preprocessor + XGBoost
+        pipe = Pipeline([("preprocessor", design["preprocessor"]), ("classifier", clf)])
+        model_path = f"models/{lbl}_model.pkl"
+        with open(model_path, "wb") as f:
+            pickle.dump(pipe, f)
+        trained_models[lbl] = pipe
+        print(f"{lbl} model saved → {model_path}")
+
+    print("\nTraining wall-clock time")
+    for lbl, (_, _, seconds) in zip(LABELS, results):
+        print(f"  {lbl:<16} {seconds:7.2f} s")
+    print(f"  {'total':<16} {total:7.2f} s")
+
+    if onehot:
+        # Save preprocessor separately
+        preprocessor = design["preprocessor"]
+        with open("models/preprocessor.pkl", "wb") as f:
+            pickle.dump(preprocessor, f)
+        print("Preprocessor saved → models/preprocessor.pkl")
+
+        # Shared-preprocessor predictor (one encoding pass for all four labels)
+        multihead = MultiHeadPredictor.from_pipelines(trained_models, label_encoders)
+        # serving encoder == pipeline preprocessor, on real rows as well as the
+        # hand-picked canaries
+        multihead.encoder.check_against(preprocessor)
+        multihead.encoder.check_against(preprocessor, sample_rows(args.data))
+        print("Serving encoder matches the pipeline preprocessor on 5000 dataset rows")
+    else:
+        multihead = MultiHeadPredictor(
+            design["encoder"],
+            {lbl: clf.get_booster() for lbl, (clf, _, _) in zip(LABELS, results)},
+            {lbl: le.classes_ for lbl, le in label_encoders.items()},
+        )
 
-    pipe.fit(X_train, y_train)
+    # Export boosters as NumPy node tables; must reproduce XGBoost on every row
+    ensemble = multihead.export_ensemble()
+    X_encoded = design["X"]
+    xgb_codes = multihead.predict_codes(X_encoded, backend="xgboost")
+    for lbl, codes in ensemble.predict_codes(X_encoded).items():
+        mismatches = int((codes != xgb_codes[lbl]).sum())
+        if mismatches:
+            raise RuntimeError(f"{lbl}: tree export disagrees on {mismatches} rows")
+    multihead.use_ensemble(ensemble)
 
-    y_pred = pipe.predict(X_test)
-    print(classification_report(y_test, y_pred))
+    # Versioned serving bundle (manifest, native boosters, tree tables)
+    manifest = write_bundle(multihead, "models/bundle")
+    print(f"Model bundle {manifest['version']} saved → models/bundle")
 
-    # Save pipeline
-    model_path = f"models/{lbl}_model.pkl"
-    with open(model_path, "wb") as f:
-        pickle.dump(pipe, f)
-    trained_models[lbl] = pipe
-    print(f"{lbl} model saved → {model_path}")
 
-# Save preprocessor separately
-with open("models/preprocessor.pkl", "wb") as f:
-    pickle.dump(preprocessor, f)
-print("Preprocessor saved → models/preprocessor.pkl")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,261 @@
+import json
+
+import numpy as np
+
+
+def _tree_depth(left, right):
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+class TreeEnsemble:
+    """
+    Gradient-boosted trees of one or more multi-class models flattened into
+    array-backed node tables and scored with NumPy.
+
+    Each tree is stored as a complete binary tree of the ensemble's max depth in
+    heap order: `feature` / `threshold` / `default_left` for the 2**depth - 1
+    split nodes and `leaf_value` for the 2**depth leaves. A leaf reached early
+    in the original tree is copied into every leaf below it, so all rows take
+    exactly `depth` steps and child positions are arithmetic (2p+1 / 2p+2).
+    Every row walks all trees at once, so scoring costs `depth` vectorised
+    gathers whatever the tree count. Trees of all labels share one table,
+    sorted by output column; `offsets` slices each label's classes out of the
+    margin matrix.
+
+    Categorical splits (boosters trained with native categorical support) are
+    flagged in `categorical` and keep their category set as a bitmask in
+    `category_mask`: rows whose code is in the set go right, other valid codes
+    go left, and a missing value follows `default_left`.
+    """
+
+    MAX_CATEGORIES = 64  # codes that fit a uint64 category mask
+
+    ARRAYS = [
+        "feature",
+        "threshold",
+        "default_left",
+        "leaf_value",
+        "tree_output",
+        "base_margin",
+        "offsets",
+    ]
+    CATEGORICAL_ARRAYS = ["categorical", "category_mask"]  # absent in older files
+
+    def __init__(
+        self,
+        labels,
+        feature,
+        threshold,
+        default_left,
+        leaf_value,
+        tree_output,
+        base_margin,
+        offsets,
+        categorical=None,
+        category_mask=None,
+    ):
+        self.labels = list(labels)
+        self.feature = np.asarray(feature, dtype=np.int64)
+        self.threshold = np.asarray(threshold, dtype=np.float32)
+        self.default_left = np.asarray(default_left, dtype=bool)
+        self.leaf_value = np.asarray(leaf_value, dtype=np.float32)
+        self.tree_output = np.asarray(tree_output, dtype=np.int64)
+        self.base_margin = np.asarray(base_margin, dtype=np.float64)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if categorical is None:
+            categorical = np.zeros(self.feature.shape, dtype=bool)
+        if category_mask is None:
+            category_mask = np.zeros(self.feature.shape, dtype=np.uint64)
+        self.categorical = np.asarray(categorical, dtype=bool)
+        self.category_mask = np.asarray(category_mask, dtype=np.uint64)
+
+        n_trees, n_splits = self.feature.shape
+        self.depth = int(np.log2(n_splits + 1))
+        if np.any(np.diff(self.tree_output) < 0):
+            raise ValueError("trees must be sorted by output column")
+        self._split_base = (np.arange(n_trees) * n_splits)[None, :]
+        self._leaf_base = (np.arange(n_trees) * self.leaf_value.shape[1])[None, :]
+        self._feature = self.feature.ravel()
+        self._threshold = self.threshold.ravel()
+        self._default_right = ~self.default_left.ravel()
+        self._has_categorical = bool(self.categorical.any())
+        self._categorical = self.categorical.ravel()
+        self._category_mask = self.category_mask.ravel()
+        self._leaf_value = self.leaf_value.ravel().astype(np.float64)
+        # first tree of every output column, for one reduceat over the leaves
+        self._output_start = np.searchsorted(
+            self.tree_output, np.arange(self.base_margin.size)
+        )
+
+    # export / persistence
+    @classmethod
+    def from_boosters(cls, boosters, n_features):
+        """
+        Flatten {label: xgboost.Booster} (multi:softprob / softmax models) into
+        one ensemble. Base margins are measured from the booster itself, so
+        they stay right whatever base_score representation the model uses.
+        """
+        trees, outputs, offsets = [], [], [0]
+        for lbl, booster in boosters.items():
+            learner = json.loads(booster.save_raw("json"))["learner"]
+            if learner["objective"]["name"] not in ("multi:softprob", "multi:softmax"):
+                raise ValueError(f"{lbl}: unsupported objective")
+            model = learner["gradient_booster"]["model"]
+            for tree, cls_idx in zip(model["trees"], model["tree_info"]):
+                if any(c >= cls.MAX_CATEGORIES for c in tree["categories"]):
+                    raise ValueError(
+                        f"{lbl}: category codes >= {cls.MAX_CATEGORIES} are not supported"
+                    )
+                trees.append(tree)
+                outputs.append(offsets[-1] + cls_idx)
+            offsets.append(
+                offsets[-1] + int(learner["learner_model_param"]["num_class"])
+            )
+
+        depth = max(_tree_depth(t["left_children"], t["right_children"]) for t in trees)
+        n_splits, n_leaves = 2**depth - 1, 2**depth
+        order = np.argsort(outputs, kind="stable")
+        feature = np.zeros((len(trees), n_splits), dtype=np.int64)
+        threshold = np.full((len(trees), n_splits), np.inf, dtype=np.float32)
+        default_left = np.ones((len(trees), n_splits), dtype=bool)
+        leaf_value = np.zeros((len(trees), n_leaves), dtype=np.float32)
+        categorical = np.zeros((len(trees), n_splits), dtype=bool)
+        category_mask = np.zeros((len(trees), n_splits), dtype=np.uint64)
+
+        for row, i in enumerate(order):
+            t = trees[i]
+            # category set of each categorical split node, as a bitmask
+            masks = {}
+            for node, start, size in zip(
+                t["categories_nodes"], t["categories_segments"], t["categories_sizes"]
+            ):
+                masks[node] = sum(1 << c for c in t["categories"][start : start + size])
+            stack = [(0, 0)]  # (xgboost node id, heap position)
+            while stack:
+                node, pos = stack.pop()
+                if t["left_children"][node] == -1:
+                    # leaf: its weight (stored in split_conditions) fills every
+                    # complete-tree leaf below `pos`
+                    lo, hi = pos, pos
+                    while lo < n_splits:
+                        lo, hi = 2 * lo + 1, 2 * hi + 2
+                    leaf_value[row, lo - n_splits : hi - n_splits + 1] = t[
+                        "split_conditions"
+                    ][node]
+                    continue
+                feature[row, pos] = t["split_indices"][node]
+                threshold[row, pos] = t["split_conditions"][node]
+                default_left[row, pos] = bool(t["default_left"][node])
+                if t["split_type"][node]:
+                    categorical[row, pos] = True
+                    category_mask[row, pos] = masks[node]
+                stack.append((t["left_children"][node], 2 * pos + 1))
+                stack.append((t["right_children"][node], 2 * pos + 2))
+
+        ensemble = cls(
+            boosters.keys(),
+            feature,
+            threshold,
+            default_left,
+            leaf_value,
+            np.asarray(outputs)[order],
+            np.zeros(offsets[-1]),
+            offsets,
+            categorical,
+            category_mask,
+        )
+        probe = np.zeros((1, n_features), dtype=np.float32)
+        leaf_sum = ensemble.margins(probe)[0]
+        # inplace_predict applies the feature types stored in each booster
+        measured = np.concatenate(
+            [
+                np.asarray(b.inplace_predict(probe, predict_type="margin")).reshape(-1)
+                for b in boosters.values()
+            ]
+        )
+        ensemble.base_margin = measured - leaf_sum
+        return ensemble
+
+    def to_arrays(self):
+        arrays = {name: getattr(self, name) for name in self.ARRAYS}
+        if self._has_categorical:
+            arrays.update(
+                {name: getattr(self, name) for name in self.CATEGORICAL_ARRAYS}
+            )
+        arrays["labels"] = np.asarray(self.labels)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        names = cls.ARRAYS + [n for n in cls.CATEGORICAL_ARRAYS if n in arrays]
+        return cls(
+            [str(lbl) for lbl in arrays["labels"]],
+            **{name: arrays[name] for name in names},
+        )
+
+    def save(self, path):
+        np.savez(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls.from_arrays(arrays)
+
+    # scoring
+    def margins(self, X, chunk_rows=256):
+        """Raw (pre-softmax) scores, shape (n_rows, total classes across labels)."""
+        X = np.asarray(X, dtype=np.float32)
+        if X.shape[0] > chunk_rows:
+            # bound the (rows, trees) working set for large batches
+            return np.concatenate(
+                [
+                    self._margins(X[i : i + chunk_rows])
+                    for i in range(0, X.shape[0], chunk_rows)
+                ]
+            )
+        return self._margins(X)
+
+    def _margins(self, X):
+        n_rows, n_cols = X.shape
+        values = X.ravel()
+        row_base = (np.arange(n_rows) * n_cols)[:, None]
+        has_missing = np.isnan(values).any()
+        pos = np.zeros((n_rows, self.feature.shape[0]), dtype=np.int64)
+        for _ in range(self.depth):
+            idx = pos + self._split_base
+            x = values.take(self._feature.take(idx) + row_base)
+            go_right = ~(x < self._threshold.take(idx))
+            if self._has_categorical:
+                # set membership only where the node is a categorical split
+                cat = np.flatnonzero(self._categorical.take(idx))
+                go_right.ravel()[cat] = self._in_category_set(
+                    x.ravel()[cat], self._category_mask.take(idx.ravel()[cat])
+                )
+            if has_missing:
+                go_right = np.where(
+                    np.isnan(x), self._default_right.take(idx), go_right
+                )
+            pos = 2 * pos + 1 + go_right
+        leaves = self._leaf_value.take(pos - self.feature.shape[1] + self._leaf_base)
+        margins = np.add.reduceat(leaves, self._output_start, axis=1)
+        return margins + self.base_margin
+
+    def _in_category_set(self, x, mask):
+        # codes outside [0, MAX_CATEGORIES) are never in a set (NaN included;
+        # missing values are routed by default_left afterwards)
+        valid = (x >= 0) & (x < self.MAX_CATEGORIES)
+        codes = np.where(valid, x, 0).astype(np.uint64)
+        return valid & ((mask >> codes) & np.uint64(1)).astype(bool)
+
+    def predict_codes(self, X):
+        """{label: class index per row}, the argmax of each label's margins."""
+        margins = self.margins(X)
+        return {
+            lbl: margins[:, self.offsets[i] : self.offsets[i + 1]].argmax(axis=1)
+            for i, lbl in enumerate(self.labels)
+        }
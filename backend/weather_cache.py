@@ -0,0 +1,423 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_city(city: str) -> str:
+    """
+    Canonical cache key for a city query: trimmed, case-folded, single-spaced.
+    "  New   York " and "new york" hit the same entry.
+    """
+    return " ".join(city.split()).casefold()
+
+
+class TTLCache:
+    """
+    Thread-safe in-process cache with per-entry TTL and bounded LRU size.
+    Expired entries are dropped lazily on access; when full, the least recently
+    used entry is evicted.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600.0, clock=time.monotonic):
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        """Return the cached value or None on miss/expiry."""
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        expires_at = self._clock() + (self.ttl if ttl is None else float(ttl))
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    # Cross-process fetch coordination; one process has nothing to coordinate
+    # (SingleFlight already coalesces its own concurrent misses).
+    def claim(self, key, lease=None):
+        return True
+
+    def release(self, key):
+        pass
+
+    # Async API shared with SQLiteCache; in memory there is nothing to offload.
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, ttl=None):
+        self.set(key, value, ttl)
+
+    async def aclaim(self, key, lease=None):
+        return True
+
+    async def arelease(self, key):
+        pass
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class SQLiteCache:
+    """
+    TTLCache-compatible cache in a SQLite file (WAL mode), shared by every
+    process that opens the same path and kept across restarts. Values are
+    stored as JSON with a wall-clock expiry, so any worker sees entries written
+    by the others. Each cache is a `namespace` in the file.
+
+    `claim` / `release` take a per-key fetch lease in the same file, so only one
+    process fetches a missing key while the others `wait_for` its result. A
+    lease expires on its own if its holder dies. Hit / miss counters are per
+    process; `size` is shared.
+
+    Every statement blocks on file I/O and, when another process is writing,
+    on its lock (up to `busy_timeout`). The async `aget` / `aset` / `aclaim` /
+    `arelease` / `wait_for` therefore run it in a worker thread, so the event
+    loop keeps serving while one request waits. Each write is a single short
+    transaction. A lock that is not granted in time counts as a miss, and the
+    caller then fetches for itself instead of failing the request.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            stored_at REAL NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS leases (
+            namespace TEXT NOT NULL,
+            key TEXT NOT NULL,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (namespace, key)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(
+        self,
+        path,
+        namespace,
+        maxsize=1024,
+        ttl=600.0,
+        lease=15.0,
+        busy_timeout=0.5,
+        clock=time.time,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = int(maxsize)
+        self.ttl = float(ttl)
+        self.lease = float(lease)
+        self.busy_timeout = float(busy_timeout)
+        self._clock = clock
+        self._local = threading.local()  # one connection per thread
+        self._lock = threading.Lock()  # counters; statements run in many threads
+        self._owner = f"{os.getpid()}:{id(self)}"
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.peer_waits = 0
+        self.lock_timeouts = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # autocommit outside explicit transactions
+            conn = sqlite3.connect(
+                self.path,
+                timeout=self.busy_timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # enough for a cache
+            self._local.conn = conn
+        return conn
+
+    def _count(self, **deltas):
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    @property
+    def enabled(self):
+        return self.maxsize > 0 and self.ttl > 0
+
+    def _lookup(self, key):
+        """(value or None, expired); a locked database reads as a miss."""
+        try:
+            row = (
+                self._connect()
+                .execute(
+                    "SELECT expires_at, value FROM cache"
+                    " WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                .fetchone()
+            )
+        except sqlite3.OperationalError:
+            self._count(lock_timeouts=1)
+            return None, False
+        if row is None:
+            return None, False
+        expires_at, value = row
+        if expires_at <= self._clock():
+            return None, True
+        return json.loads(value), False
+
+    # blocking API (worker threads, scripts)
+    def get(self, key):
+        """Return the cached value or None on miss/expiry."""
+        value, expired = self._lookup(key)
+        if value is None:
+            self._count(misses=1, expirations=int(expired))
+            return None
+        self._count(hits=1)
+        return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        now = self._clock()
+        expires_at = now + (self.ttl if ttl is None else float(ttl))
+        payload = json.dumps(value)
+        conn = self._connect()
+        try:
+            # one write transaction: the entry, expired rows, and the oldest
+            # writes beyond maxsize
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, expires_at, now, payload),
+                )
+                expired = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                    (self.namespace, now),
+                ).rowcount
+                evicted = conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    " SELECT key FROM cache WHERE namespace = ?"
+                    " ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                    (self.namespace, self.namespace, self.maxsize),
+                ).rowcount
+        except sqlite3.OperationalError:
+            self._count(lock_timeouts=1)  # not cached this time
+            return
+        self._count(expirations=expired, evictions=evicted)
+
+    def claim(self, key, lease=None):
+        """
+        True if this process should fetch `key`: nothing fresh is cached and no
+        other live process holds its lease (which this call then takes). Also
+        True when the database stays locked, so the caller is never blocked.
+        """
+        if not self.enabled:
+            return True
+        now = self._clock()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                fresh = conn.execute(
+                    "SELECT 1 FROM cache"
+                    " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (self.namespace, key, now),
+                ).fetchone()
+                if fresh:
+                    return False
+                conn.execute(
+                    "DELETE FROM leases"
+                    " WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                    (self.namespace, key, now),
+                )
+                return (
+                    conn.execute(
+                        "INSERT OR IGNORE INTO leases VALUES (?, ?, ?, ?)",
+                        (self.namespace, key, self._owner, now + (lease or self.lease)),
+                    ).rowcount
+                    == 1
+                )
+        except sqlite3.OperationalError:
+            self._count(lock_timeouts=1)
+            return True
+
+    def release(self, key):
+        if not self.enabled:
+            return
+        try:
+            self._connect().execute(
+                "DELETE FROM leases WHERE namespace = ? AND key = ? AND owner = ?",
+                (self.namespace, key, self._owner),
+            )
+        except sqlite3.OperationalError:
+            self._count(lock_timeouts=1)  # the lease expires on its own
+
+    def _lease_held(self, key):
+        try:
+            return (
+                self._connect()
+                .execute(
+                    "SELECT 1 FROM leases WHERE namespace = ? AND key = ?"
+                    " AND expires_at > ?",
+                    (self.namespace, key, self._clock()),
+                )
+                .fetchone()
+                is not None
+            )
+        except sqlite3.OperationalError:
+            return False
+
+    # async API (the event loop): the same calls in a worker thread
+    async def aget(self, key):
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key, value, ttl=None):
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    async def aclaim(self, key, lease=None):
+        return await asyncio.to_thread(self.claim, key, lease)
+
+    async def arelease(self, key):
+        await asyncio.to_thread(self.release, key)
+
+    async def wait_for(self, key, timeout=None, interval=0.05):
+        """
+        Poll for a value another process is fetching. Returns it (counted as a
+        hit), or None once the lease is gone without a value or `timeout` passes.
+        """
+        self._count(peer_waits=1)
+        deadline = self._clock() + (self.lease if timeout is None else timeout)
+        while True:
+            value, _ = await asyncio.to_thread(self._lookup, key)
+            if value is not None:
+                self._count(hits=1)
+                return value
+            held = await asyncio.to_thread(self._lease_held, key)
+            if not held or self._clock() >= deadline:
+                return None
+            await asyncio.sleep(interval)
+
+    def clear(self):
+        self._connect().execute(
+            "DELETE FROM cache WHERE namespace = ?", (self.namespace,)
+        )
+
+    def __len__(self):
+        return (
+            self._connect()
+            .execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, self._clock()),
+            )
+            .fetchone()[0]
+        )
+
+    def stats(self):
+        try:
+            size = len(self)
+        except sqlite3.OperationalError:
+            size = None
+        with self._lock:
+            return {
+                "backend": "sqlite",
+                "path": self.path,
+                "size": size,
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "peer_waits": self.peer_waits,
+                "lock_timeouts": self.lock_timeouts,
+            }
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent async calls that share a key: the first caller starts the
+    work, later callers await the same task and receive its result or exception.
+    The work runs as its own task, so a cancelled caller does not cancel it for
+    the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.collapsed = 0
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved even if every caller went away
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight),
+            "calls": self.calls,
+            "collapsed": self.collapsed,
+        }